@@ -0,0 +1,108 @@
+"""
+Benchmark of positions history flattening on synthetic ~100k-row responses.
+
+Compares the single-pass _flatten_positions with the previous implementation
+(split of every date key plus separate stats passes) and checks that both
+produce the same rows and stats.
+
+Run from the repository root:
+    python -m benchmarks.positions_flatten
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from tools.topvisor import _flatten_positions
+
+# (keywords, days, regions) - about 100k rows each
+CASES = [(3334, 30, 1), (1000, 50, 2), (100000, 1, 1)]
+REPEATS = 5
+PROJECT_ID = 19294818
+
+
+def synthetic_keywords(keywords, days, regions):
+    """positions_2/history keywords with positionsData for every date and region"""
+    start = datetime(2025, 1, 1)
+    dates = [(start + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(days)]
+    result = []
+    for keyword in range(keywords):
+        positions_data = {}
+        for region in range(regions):
+            for day, date in enumerate(dates):
+                rank = (keyword * 7 + day * 3 + region) % 120
+                positions_data[f"{date}:{PROJECT_ID}:{33 + region}"] = {
+                    "position": str(rank) if rank <= 100 else "--"
+                }
+        result.append(
+            {"id": keyword, "name": f"keyword {keyword}", "positionsData": positions_data}
+        )
+    return result
+
+
+def flatten_positions_previous(keywords):
+    """Previous implementation: rows first, then stats in separate passes"""
+    positions_info = []
+
+    for keyword_data in keywords:
+        if isinstance(keyword_data, dict):
+            keyword_name = keyword_data.get("name", "unknown")
+            positions_data = keyword_data.get("positionsData", {})
+
+            for date_key, position_info in positions_data.items():
+                if isinstance(position_info, dict) and "position" in position_info:
+                    parts = date_key.split(":")
+                    if len(parts) >= 3:
+                        position_value = position_info["position"]
+                        positions_info.append(
+                            {
+                                "keyword_name": keyword_name,
+                                "date": parts[0],
+                                "position": position_value,
+                                "project_id": parts[1],
+                                "region": parts[2],
+                                "position_numeric": (
+                                    int(position_value)
+                                    if position_value.isdigit()
+                                    else None
+                                ),
+                                "is_not_ranking": position_value == "--",
+                            }
+                        )
+
+    return positions_info, {
+        "total_count": len(positions_info),
+        "unique_keywords": len(set(pos["keyword_name"] for pos in positions_info)),
+        "date_range": {
+            "start": min((pos["date"] for pos in positions_info), default="no_data"),
+            "end": max((pos["date"] for pos in positions_info), default="no_data"),
+        },
+    }
+
+
+def best_ms(function, keywords):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        function(keywords)
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main():
+    print(f"best of {REPEATS} runs")
+    for case in CASES:
+        keywords = synthetic_keywords(*case)
+        if flatten_positions_previous(keywords) != _flatten_positions(keywords):
+            raise SystemExit(f"Outputs differ for {case}")
+
+        previous_ms = best_ms(flatten_positions_previous, keywords)
+        current_ms = best_ms(_flatten_positions, keywords)
+        print(
+            "{} keywords x {} days x {} regions: {:.0f} ms -> {:.0f} ms ({:.2f}x)".format(
+                *case, previous_ms, current_ms, previous_ms / current_ms
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,79 +1,148 @@
+import asyncio
+import httpx
 import requests
 import json
+import logging
+import time
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 
+from logic.cache import (
+    cache_key,
+    credentials_id,
+    lookup_response,
+    lookup_response_async,
+    store_response,
+    store_response_async,
+)
+from logic.log import log_request_timing
+from logic.ratelimit import get_rate_limiter
+from logic.retry import RetryState
+from logic.session import AHREFS_API_ROOT, get_async_client, get_session
+from logic.singleflight import async_inflight, inflight
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 class AhrefsAPI:
     def __init__(
         self,
         api_key=os.getenv("AHREFS_API_KEY"),
+        session=None,
     ):
         self.api_key = api_key
         self.base_url = "https://api.ahrefs.com/v3"
+        # Shared keep-alive connection pool unless a session is given explicitly
+        self.session = session or get_session()
 
         if not self.api_key:
             raise ValueError(
                 "API key Ahrefs not found! Please set AHREFS_API_KEY environment variable."
             )
 
+        # Quota is shared by all clients (sync and async) with the same key
+        self.rate_limiter = get_rate_limiter("ahrefs", self.api_key)
+
+        # Responses are cached per credentials
+        self.cache_namespace = credentials_id("ahrefs", self.api_key)
+
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}",
         }
 
-    def _make_request(self, endpoint, params=None):
+    def _send(self, endpoint, params):
+        """Send request with rate limiting and retries, error dict on failure"""
         url = f"{self.base_url}/{endpoint}"
-
-        # Debug request output
-        print(f"\nSending request:")
-        print(f"URL: {url}")
-        print(f"Headers: {json.dumps(self.headers, indent=2, ensure_ascii=False)}")
-        print(f"Params: {json.dumps(params, indent=2, ensure_ascii=False)}")
-
-        try:
-            response = requests.get(
-                url, headers=self.headers, params=params, timeout=60
+        # Lazy formatting: nothing is serialized unless DEBUG is enabled.
+        # Headers are never logged, they contain the bearer token
+        logger.debug("Sending request %s params=%s", url, params)
+
+        retry = RetryState()
+        while True:
+            waited = self.rate_limiter.acquire()
+            if waited:
+                logger.debug("Rate limiter delayed %s by %.2fs", endpoint, waited)
+
+            started = time.perf_counter()
+            status = "error"
+            try:
+                response = self.session.get(
+                    url, headers=self.headers, params=params, timeout=retry.timeout()
+                )
+                status = response.status_code
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response, error = None, e
+            except Exception as e:
+                logger.exception("Error while executing request %s", endpoint)
+                return {"error": f"Unexpected error: {str(e)}"}
+            finally:
+                log_request_timing("ahrefs", endpoint, status, started)
+
+            delay = retry.next_delay(response)
+            if delay is None:
+                break
+            logger.info(
+                "Retry %s of %s in %.2fs after status=%s",
+                retry.attempt,
+                endpoint,
+                delay,
+                status,
             )
+            time.sleep(delay)
 
-            # Debug response output
-            print(f"\nReceived response:")
-            print(f"Status Code: {response.status_code}")
-
-            if response.status_code == 200:
-                data = response.json()
-                print(f"Successful API response")
-                return data
-            elif response.status_code == 401:
-                print(f"Authorization error: Check API key")
-                print(f"Error text: {response.text}")
-                return {"error": "Invalid API key", "status_code": 401}
-            elif response.status_code == 403:
-                print(f"Access denied: Insufficient permissions or credits")
-                return {
-                    "error": "Insufficient access permissions or credits",
-                    "status_code": 403,
-                }
-            elif response.status_code == 429:
-                print(f"Request limit exceeded")
-                return {"error": "Request limit exceeded", "status_code": 429}
-            else:
-                print(f"API error: {response.status_code}")
-                print(f"Error text: {response.text}")
-                return {
-                    "error": f"API error {response.status_code}",
-                    "details": response.text,
-                }
-
-        except requests.ConnectionError:
-            print(f"Connection error with Ahrefs API")
+        if response is None:
+            logger.warning(
+                "Connection error with Ahrefs API (%s): %s", endpoint, error
+            )
             return {"error": "No internet connection or API unavailable"}
-        except Exception as e:
-            print(f"An error occurred while executing request: {str(e)}")
-            return {"error": f"Unexpected error: {str(e)}"}
+        return response
+
+    def _make_request(self, endpoint, params=None):
+        key, cached = lookup_response(self.cache_namespace, endpoint, params)
+        if cached is not None:
+            return self._handle_response(cached)
+
+        # Identical requests in flight share one upstream call
+        response, shared = inflight.do(
+            cache_key(self.cache_namespace, endpoint, params),
+            lambda: self._send(endpoint, params),
+        )
+        if isinstance(response, dict):
+            return dict(response)
+
+        result = self._handle_response(response)
+        if not shared:
+            store_response(key, endpoint, params, response, result)
+        return result
+
+    def _handle_response(self, response):
+        """Convert requests/httpx response into result or error dict"""
+        logger.debug("Received response status=%s", response.status_code)
+
+        if response.status_code == 200:
+            return response.json()
+        elif response.status_code == 401:
+            logger.warning("Authorization error, check API key: %s", response.text)
+            return {"error": "Invalid API key", "status_code": 401}
+        elif response.status_code == 403:
+            logger.warning("Access denied: insufficient permissions or credits")
+            return {
+                "error": "Insufficient access permissions or credits",
+                "status_code": 403,
+            }
+        elif response.status_code == 429:
+            logger.warning("Request limit exceeded")
+            return {"error": "Request limit exceeded", "status_code": 429}
+        else:
+            logger.warning("API error %s: %s", response.status_code, response.text)
+            return {
+                "error": f"API error {response.status_code}",
+                "details": response.text,
+            }
 
     def get_refdomains(
         self,
@@ -98,27 +167,7 @@ class AhrefsAPI:
             "select": select,
         }
 
-        # Temporary debug information
-        print(f"🔍 Sending request site-explorer/refdomains:")
-        print(f"   Target: {target}")
-        print(f"   Limit: {limit}")
-        print(f"   Sorting: {order_by}")
-        print(f"   Fields: {select}")
-
-        result = self._make_request("site-explorer/refdomains", params)
-
-        print(f"📊 Result site-explorer/refdomains:")
-        print(f"   Response type: {type(result)}")
-        if isinstance(result, dict):
-            print(f"   Keys in response: {list(result.keys())}")
-            if "refdomains" in result:
-                refdomains = result["refdomains"]
-                print(
-                    f"   Number of referring domains: {len(refdomains) if hasattr(refdomains, '__len__') else 'unknown'}"
-                )
-                print(f"   Refdomains data type: {type(refdomains)}")
-
-        return result
+        return self._make_request("site-explorer/refdomains", params)
 
     def get_backlinks(
         self,
@@ -178,6 +227,81 @@ class AhrefsAPI:
         return self._make_request("site-explorer/organic-keywords", params)
 
 
+class AsyncAhrefsAPI(AhrefsAPI):
+    """
+    Asyncio version of AhrefsAPI backed by a pooled httpx client.
+
+    Methods that only build params are inherited: they return the
+    coroutine of _make_request, so every API method is simply awaited.
+    """
+
+    async def _send(self, endpoint, params):
+        """Send request with rate limiting and retries, error dict on failure"""
+        url = f"{self.base_url}/{endpoint}"
+        logger.debug("Sending request %s params=%s", url, params)
+
+        retry = RetryState()
+        while True:
+            waited = await self.rate_limiter.acquire_async()
+            if waited:
+                logger.debug("Rate limiter delayed %s by %.2fs", endpoint, waited)
+
+            started = time.perf_counter()
+            status = "error"
+            try:
+                client = get_async_client(AHREFS_API_ROOT)
+                response = await client.get(
+                    url, headers=self.headers, params=params, timeout=retry.timeout()
+                )
+                status = response.status_code
+            except httpx.TransportError as e:
+                response, error = None, e
+            except Exception as e:
+                logger.exception("Error while executing request %s", endpoint)
+                return {"error": f"Unexpected error: {str(e)}"}
+            finally:
+                log_request_timing("ahrefs", endpoint, status, started)
+
+            delay = retry.next_delay(response)
+            if delay is None:
+                break
+            logger.info(
+                "Retry %s of %s in %.2fs after status=%s",
+                retry.attempt,
+                endpoint,
+                delay,
+                status,
+            )
+            await asyncio.sleep(delay)
+
+        if response is None:
+            logger.warning(
+                "Connection error with Ahrefs API (%s): %s", endpoint, error
+            )
+            return {"error": "No internet connection or API unavailable"}
+        return response
+
+    async def _make_request(self, endpoint, params=None):
+        key, cached = await lookup_response_async(
+            self.cache_namespace, endpoint, params
+        )
+        if cached is not None:
+            return self._handle_response(cached)
+
+        # Identical requests in flight share one upstream call
+        response, shared = await async_inflight.do(
+            cache_key(self.cache_namespace, endpoint, params),
+            lambda: self._send(endpoint, params),
+        )
+        if isinstance(response, dict):
+            return dict(response)
+
+        result = self._handle_response(response)
+        if not shared:
+            await store_response_async(key, endpoint, params, response, result)
+        return result
+
+
 # Usage example
 if __name__ == "__main__":
     ahrefs = AhrefsAPI()
@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from logic.disk_cache import get_disk_cache, is_immutable
+from logic.stats import record_cache
+from logic.utils import is_json
+
+load_dotenv()
+
+CACHE_ENABLED = os.getenv("API_CACHE_ENABLED", "1") != "0"
+# Upper bound of cached response bodies, LRU entries are evicted above it
+CACHE_MAX_BYTES = int(os.getenv("API_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Seconds a successful response of an endpoint stays fresh, 0 - never cached
+ENDPOINT_TTLS = {
+    # Topvisor
+    "projects_2/projects": 600,
+    "projects_2/competitors": 3600,
+    "positions_2/searchers_regions/export": 3600,
+    "keywords_2/folders": 600,
+    "keywords_2/groups": 600,
+    "keywords_2/keywords": 600,
+    "positions_2/history": 300,
+    "positions_2/summary": 300,
+    "bank_2/info": 0,
+    # Ahrefs
+    "site-explorer/refdomains": 3600,
+    "site-explorer/all-backlinks": 3600,
+    "site-explorer/organic-keywords": 3600,
+}
+# Memory TTL of immutable responses of endpoints without own TTL
+IMMUTABLE_MEMORY_TTL = 3600
+
+
+def credentials_id(*credentials):
+    """Stable short id of API credentials, raw keys never end up in cache keys"""
+    raw = "\0".join(str(part) for part in credentials)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(namespace, endpoint, payload):
+    """Key of endpoint + canonicalized payload/params for given credentials"""
+    canonical = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return f"{namespace}:{endpoint}:{canonical}"
+
+
+class CachedResponse:
+    """Minimal stand-in for requests/httpx response built from a cached body"""
+
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ResponseCache:
+    """Thread-safe in-memory TTL cache of response bodies with LRU eviction by size"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Get cached body or None when missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, content = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                self.size -= len(content)
+                return None
+            self.entries.move_to_end(key)
+            return content
+
+    def set(self, key, content, ttl):
+        if len(content) > self.max_bytes:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            self.entries[key] = (time.monotonic() + ttl, content)
+            self.size += len(content)
+
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+# Process-wide cache shared by sync and async clients
+response_cache = ResponseCache()
+
+
+def _lookup_memory(namespace, endpoint, payload):
+    """
+    Returns:
+        (key, content or None, immutable); key is None for uncached requests
+    """
+    ttl = ENDPOINT_TTLS.get(endpoint, 0)
+    immutable = is_immutable(endpoint, payload)
+    if not CACHE_ENABLED or not (ttl or immutable):
+        return None, None, False
+
+    key = cache_key(namespace, endpoint, payload)
+    return key, response_cache.get(key), immutable
+
+
+def _lookup_disk(key, endpoint):
+    """Read immutable response from disk and keep it in memory as well"""
+    disk_cache = get_disk_cache()
+    content = disk_cache.get(key) if disk_cache else None
+    if content is not None:
+        response_cache.set(
+            key, content, ENDPOINT_TTLS.get(endpoint, 0) or IMMUTABLE_MEMORY_TTL
+        )
+    return content
+
+
+def _lookup_result(key, content):
+    record_cache(hit=content is not None)
+    if content is None:
+        return key, None
+    return key, CachedResponse(content)
+
+
+def lookup_response(namespace, endpoint, payload):
+    """
+    Look up cached response of a request in memory, then on disk.
+
+    Returns:
+        (key, CachedResponse or None); key is None for uncached requests
+    """
+    key, content, immutable = _lookup_memory(namespace, endpoint, payload)
+    if key is None:
+        return None, None
+    if content is None and immutable:
+        content = _lookup_disk(key, endpoint)
+    return _lookup_result(key, content)
+
+
+async def lookup_response_async(namespace, endpoint, payload):
+    """lookup_response for async clients, the disk is read in a worker thread"""
+    key, content, immutable = _lookup_memory(namespace, endpoint, payload)
+    if key is None:
+        return None, None
+    if content is None and immutable:
+        content = await asyncio.to_thread(_lookup_disk, key, endpoint)
+    return _lookup_result(key, content)
+
+
+def _cacheable(key, response, result):
+    """Only successful responses are cached (API-level errors are not)"""
+    if key is None or response.status_code != 200:
+        return False
+    if isinstance(result, dict) and (result.get("errors") or result.get("error")):
+        return False
+    # CSV endpoints wrap the body as {"result": text}; a JSON body there is an
+    # API error returned with status 200
+    if isinstance(result, dict) and isinstance(result.get("result"), str):
+        if is_json(result["result"]):
+            return False
+    return True
+
+
+def _store_disk(key, endpoint, content):
+    disk_cache = get_disk_cache()
+    if disk_cache:
+        disk_cache.set(key, endpoint, content)
+
+
+def _store_memory(key, endpoint, content, immutable):
+    ttl = ENDPOINT_TTLS.get(endpoint, 0)
+    if immutable:
+        ttl = ttl or IMMUTABLE_MEMORY_TTL
+    response_cache.set(key, content, ttl)
+
+
+def store_response(key, endpoint, payload, response, result):
+    """Cache body of a successful response (API-level errors are not cached)"""
+    if not _cacheable(key, response, result):
+        return
+    immutable = is_immutable(endpoint, payload)
+    if immutable:
+        _store_disk(key, endpoint, response.content)
+    _store_memory(key, endpoint, response.content, immutable)
+
+
+async def store_response_async(key, endpoint, payload, response, result):
+    """store_response for async clients, the disk is written in a worker thread"""
+    if not _cacheable(key, response, result):
+        return
+    immutable = is_immutable(endpoint, payload)
+    if immutable:
+        await asyncio.to_thread(_store_disk, key, endpoint, response.content)
+    _store_memory(key, endpoint, response.content, immutable)
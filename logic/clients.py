@@ -0,0 +1,66 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from logic.ahrefs import AhrefsAPI, AsyncAhrefsAPI
+from logic.topvisor import AsyncTopvisorAPI, TopvisorAPI
+
+load_dotenv()
+
+# Long-lived API clients keyed by (service, credentials). Clients are built on
+# first use and shared by every tool call, so connection pools, caches and
+# rate-limit state survive between calls.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _get_or_create(key, factory):
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = factory()
+                _clients[key] = client
+    return client
+
+
+def get_topvisor_client(user_id=None, api_key=None):
+    """Get shared TopvisorAPI client for given credentials (defaults from env)"""
+    user_id = user_id or os.getenv("TOPVISOR_USER_ID")
+    api_key = api_key or os.getenv("TOPVISOR_API_KEY")
+    return _get_or_create(
+        ("topvisor", user_id, api_key),
+        lambda: TopvisorAPI(user_id=user_id, api_key=api_key),
+    )
+
+
+def get_ahrefs_client(api_key=None):
+    """Get shared AhrefsAPI client for given API key (default from env)"""
+    api_key = api_key or os.getenv("AHREFS_API_KEY")
+    return _get_or_create(("ahrefs", api_key), lambda: AhrefsAPI(api_key=api_key))
+
+
+def get_async_topvisor_client(user_id=None, api_key=None):
+    """Get shared AsyncTopvisorAPI client for given credentials (defaults from env)"""
+    user_id = user_id or os.getenv("TOPVISOR_USER_ID")
+    api_key = api_key or os.getenv("TOPVISOR_API_KEY")
+    return _get_or_create(
+        ("topvisor_async", user_id, api_key),
+        lambda: AsyncTopvisorAPI(user_id=user_id, api_key=api_key),
+    )
+
+
+def get_async_ahrefs_client(api_key=None):
+    """Get shared AsyncAhrefsAPI client for given API key (default from env)"""
+    api_key = api_key or os.getenv("AHREFS_API_KEY")
+    return _get_or_create(
+        ("ahrefs_async", api_key), lambda: AsyncAhrefsAPI(api_key=api_key)
+    )
+
+
+def clear_clients():
+    """Drop all registered clients (e.g. after credentials rotation)"""
+    with _clients_lock:
+        _clients.clear()
@@ -0,0 +1,214 @@
+import operator
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Number of datasets kept in memory, least recently used ones are dropped
+DATASET_MAX_ENTRIES = int(os.getenv("SEO_DATASET_MAX_ENTRIES", "20"))
+# Seconds a dataset stays queryable after it was fetched
+DATASET_TTL = int(os.getenv("SEO_DATASET_TTL", "3600"))
+
+FILTER_OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "in": lambda value, expected: value in expected,
+    "contains": lambda value, expected: str(expected).lower() in str(value).lower(),
+}
+
+AGGREGATES = {
+    "count": len,
+    "count_distinct": lambda values: len(set(values)),
+    "sum": sum,
+    "avg": lambda values: round(sum(values) / len(values), 2) if values else None,
+    "min": lambda values: min(values, default=None),
+    "max": lambda values: max(values, default=None),
+}
+
+
+class DatasetError(ValueError):
+    """Unknown dataset handle or invalid query"""
+
+
+class DatasetStore:
+    """Thread-safe in-memory LRU of fetched row lists addressed by handles"""
+
+    def __init__(self, max_entries=DATASET_MAX_ENTRIES, ttl=DATASET_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def put(self, rows, source):
+        """Store rows and return their handle"""
+        handle = f"ds_{secrets.token_hex(6)}"
+        with self.lock:
+            self.entries[handle] = (time.monotonic() + self.ttl, source, rows)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return handle
+
+    def get(self, handle):
+        """
+        Returns:
+            (source, rows)
+        """
+        with self.lock:
+            entry = self.entries.get(handle)
+            if entry is None or entry[0] <= time.monotonic():
+                self.entries.pop(handle, None)
+                raise DatasetError(
+                    f"Unknown or expired dataset {handle}, fetch the data again"
+                )
+            self.entries.move_to_end(handle)
+            return entry[1], entry[2]
+
+
+# Process-wide datasets shared by all tools
+datasets = DatasetStore()
+
+
+def field_names(rows, sample=100):
+    """Field names of the first rows in order of appearance"""
+    names = {}
+    for row in rows[:sample]:
+        if isinstance(row, dict):
+            names.update(dict.fromkeys(row))
+    return list(names)
+
+
+def _matches(row, filters):
+    for condition in filters:
+        value = row.get(condition["field"])
+        op = condition.get("op", "eq")
+        if value is None and op not in ("eq", "ne"):
+            return False
+        try:
+            if not FILTER_OPERATORS[op](value, condition.get("value")):
+                return False
+        except TypeError:
+            return False
+    return True
+
+
+def _sort_rows(rows, sort):
+    """Sort by fields, "-field" - descending; missing values always go last"""
+    for spec in reversed(sort):
+        descending = spec.startswith("-")
+        field = spec.lstrip("-")
+        try:
+            rows.sort(
+                key=lambda row: (
+                    (row.get(field) is None) != descending,
+                    row.get(field),
+                ),
+                reverse=descending,
+            )
+        except TypeError:  # mixed value types
+            rows.sort(
+                key=lambda row: (
+                    (row.get(field) is None) != descending,
+                    str(row.get(field)),
+                ),
+                reverse=descending,
+            )
+    return rows
+
+
+def _parse_aggregate(spec):
+    """"count" or "func:field" -> (output name, func, field)"""
+    func, _, field = spec.partition(":")
+    if func not in AGGREGATES or (func != "count" and not field):
+        raise DatasetError(
+            f"Invalid aggregate {spec}, expected count or one of "
+            + ", ".join(f"{name}:<field>" for name in AGGREGATES if name != "count")
+        )
+    return (f"{func}_{field}" if field else func), AGGREGATES[func], field
+
+
+def _group_rows(rows, group_by, aggregates):
+    parsed = [_parse_aggregate(spec) for spec in aggregates or ["count"]]
+    # Without grouping there is always one result row, also for no matched rows
+    groups = {} if group_by else {(): []}
+    for row in rows:
+        groups.setdefault(tuple(row.get(field) for field in group_by), []).append(row)
+
+    grouped = []
+    for key, group in groups.items():
+        result = dict(zip(group_by, key))
+        for name, func, field in parsed:
+            if field:
+                values = [row.get(field) for row in group]
+                values = [value for value in values if value is not None]
+            else:
+                values = group
+            try:
+                result[name] = func(values)
+            except TypeError:
+                raise DatasetError(f"Cannot compute {name}: non-numeric values")
+        grouped.append(result)
+    return grouped
+
+
+def query_rows(
+    rows,
+    filters=None,
+    fields=None,
+    sort=None,
+    group_by=None,
+    aggregates=None,
+    limit=50,
+):
+    """
+    Filter, group/aggregate, sort, project and cut rows.
+
+    Args:
+        filters: [{"field": ..., "op": eq|ne|gt|gte|lt|lte|in|contains, "value": ...}]
+        fields: Fields to keep in returned rows (ignored with group_by)
+        sort: Fields to sort by, "-field" - descending
+        group_by: Fields to group by; aggregates are computed per group
+        aggregates: "count" or "func:field" with func count_distinct|sum|avg|min|max
+        limit: Max returned rows (top-N together with sort)
+
+    Returns:
+        Dict with matched count, returned rows and their count
+    """
+    for condition in filters or []:
+        if not isinstance(condition, dict) or "field" not in condition:
+            raise DatasetError(f"Invalid filter {condition}, expected field/op/value")
+        if condition.get("op", "eq") not in FILTER_OPERATORS:
+            raise DatasetError(
+                f"Unknown filter operator {condition['op']}, expected one of "
+                + ", ".join(FILTER_OPERATORS)
+            )
+
+    matched = [
+        row for row in rows if isinstance(row, dict) and _matches(row, filters or [])
+    ]
+    if group_by:
+        result = _group_rows(matched, group_by, aggregates)
+    elif aggregates:
+        result = _group_rows(matched, [], aggregates)
+    else:
+        result = matched
+
+    if sort:
+        result = _sort_rows(list(result), sort)
+    result = result[: max(0, limit)]
+    if fields and not (group_by or aggregates):
+        result = [{field: row.get(field) for field in fields} for row in result]
+
+    return {
+        "matched_rows": len(matched),
+        "rows": result,
+        "returned_rows": len(result),
+    }
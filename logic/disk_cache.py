@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DISK_CACHE_ENABLED = os.getenv("SEO_DISK_CACHE_ENABLED", "1") != "0"
+# Directory for on-disk data (cache database, later other local stores)
+CACHE_DIR = os.getenv("SEO_CACHE_DIR", ".cache")
+# Data for dates at least this many days old is treated as final. One extra
+# day covers the time zone gap to the API and late position rechecks
+IMMUTABLE_AFTER_DAYS = int(os.getenv("SEO_IMMUTABLE_AFTER_DAYS", "2"))
+
+# Endpoint -> payload/params field holding the last date of requested data
+IMMUTABLE_DATE_FIELDS = {
+    "positions_2/history": "date2",
+    "site-explorer/organic-keywords": "date",
+}
+
+
+def is_immutable(endpoint, payload):
+    """Check whether response covers only past dates and never changes"""
+    field = IMMUTABLE_DATE_FIELDS.get(endpoint)
+    if field is None or not isinstance(payload, dict) or not payload.get(field):
+        return False
+
+    try:
+        date = datetime.strptime(str(payload[field]), "%Y-%m-%d").date()
+    except ValueError:
+        return False
+    return date <= datetime.now().date() - timedelta(days=IMMUTABLE_AFTER_DAYS)
+
+
+class DiskCache:
+    """Permanent SQLite store of immutable response bodies"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    content BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT content FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, endpoint, content):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, content, created_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, endpoint, content, time.time()),
+            )
+
+
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache():
+    """Get shared disk cache (created on first use) or None when disabled"""
+    global _disk_cache
+    if not DISK_CACHE_ENABLED:
+        return None
+    if _disk_cache is None:
+        with _disk_cache_lock:
+            if _disk_cache is None:
+                _disk_cache = DiskCache(os.path.join(CACHE_DIR, "responses.sqlite3"))
+    return _disk_cache
@@ -0,0 +1,52 @@
+import logging
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# WARNING by default: request/response details are DEBUG, timing lines are INFO
+LOG_LEVEL = os.getenv("SEO_LOG_LEVEL", "WARNING").upper()
+# Log file path, stderr when not set. Never stdout: stdio transport uses it
+LOG_FILE = os.getenv("SEO_LOG_FILE")
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+timing_logger = logging.getLogger("logic.timing")
+
+
+def setup_logging(level=LOG_LEVEL, log_file=LOG_FILE):
+    """Send logic/tools logs to stderr or a file with given level"""
+    if log_file:
+        handler = logging.FileHandler(log_file, encoding="utf-8")
+    else:
+        handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    for name in ("logic", "tools"):
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        logger.handlers = [handler]
+        logger.propagate = False
+
+
+def log_request_timing(upstream, endpoint, status, started):
+    """
+    Write one aggregatable key=value line per upstream request.
+
+    Args:
+        upstream: API name ("topvisor" or "ahrefs")
+        endpoint: API endpoint
+        status: HTTP status code or error name
+        started: time.perf_counter() value taken before sending
+    """
+    if timing_logger.isEnabledFor(logging.INFO):
+        timing_logger.info(
+            "upstream=%s endpoint=%s status=%s elapsed_ms=%.1f",
+            upstream,
+            endpoint,
+            status,
+            (time.perf_counter() - started) * 1000,
+        )
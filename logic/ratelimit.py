@@ -0,0 +1,84 @@
+import asyncio
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Client-side quotas per upstream and API key: (requests per minute, burst)
+RATE_LIMITS = {
+    "topvisor": (
+        float(os.getenv("TOPVISOR_RATE_LIMIT_PER_MINUTE", "300")),
+        int(os.getenv("TOPVISOR_RATE_BURST", "5")),
+    ),
+    "ahrefs": (
+        float(os.getenv("AHREFS_RATE_LIMIT_PER_MINUTE", "60")),
+        int(os.getenv("AHREFS_RATE_BURST", "1")),
+    ),
+}
+
+
+class TokenBucket:
+    """
+    Token bucket shared by threads and asyncio tasks.
+
+    Every caller reserves a token under a short lock and then sleeps until
+    its token is due, so waiting callers are served in arrival order and
+    the bucket never hands out more than capacity + rate * elapsed tokens.
+    """
+
+    def __init__(self, rate_per_minute, capacity):
+        self.rate = rate_per_minute / 60
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """Take one token and return seconds to wait until it is available"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        """Block current thread until a request may be sent"""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self):
+        """Wait without blocking the event loop until a request may be sent"""
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(upstream, api_key):
+    """Get shared token bucket for upstream ("topvisor"/"ahrefs") and API key"""
+    key = (upstream, api_key)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = TokenBucket(*RATE_LIMITS[upstream])
+                _limiters[key] = limiter
+    return limiter
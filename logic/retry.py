@@ -0,0 +1,94 @@
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from dotenv import load_dotenv
+
+from logic.stats import record_retry
+
+load_dotenv()
+
+# Statuses worth another attempt: rate limit and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("API_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("API_BACKOFF_MAX", "20"))
+# Total time budget of one request including all retries, seconds
+RETRY_DEADLINE = float(os.getenv("API_RETRY_DEADLINE", "120"))
+# Per-attempt timeout, shortened when the deadline is closer
+REQUEST_TIMEOUT = 60
+
+
+def parse_retry_after(value):
+    """Convert Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryState:
+    """
+    Retry bookkeeping of one logical request.
+
+    next_delay() returns seconds to sleep before the next attempt, or None
+    when the request must not be retried: non-retryable status, attempts
+    exhausted or the delay would cross the total deadline. Delays use
+    exponential backoff with full jitter and never undercut Retry-After.
+    """
+
+    def __init__(
+        self,
+        max_retries=MAX_RETRIES,
+        backoff_base=BACKOFF_BASE,
+        backoff_max=BACKOFF_MAX,
+        deadline=RETRY_DEADLINE,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = time.monotonic() + deadline
+        self.attempt = 0
+
+    def timeout(self):
+        """Timeout for the next attempt"""
+        return max(1.0, min(REQUEST_TIMEOUT, self.deadline - time.monotonic()))
+
+    def next_delay(self, response=None):
+        """
+        Args:
+            response: Received response, None after a connection error/timeout
+        """
+        if self.attempt >= self.max_retries:
+            return None
+
+        retry_after = None
+        if response is not None:
+            if response.status_code not in RETRY_STATUSES:
+                return None
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+        delay = random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2**self.attempt)
+        )
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        if time.monotonic() + delay >= self.deadline:
+            return None
+
+        self.attempt += 1
+        record_retry()
+        return delay
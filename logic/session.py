@@ -0,0 +1,91 @@
+import asyncio
+import os
+import threading
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOPVISOR_API_ROOT = "https://api.topvisor.com"
+AHREFS_API_ROOT = "https://api.ahrefs.com"
+
+# Number of distinct hosts kept in the pool manager and default
+# number of keep-alive connections kept per host
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+
+# Per-host pool sizing, falls back to HTTP_POOL_MAXSIZE
+HOST_POOL_MAXSIZE = {
+    TOPVISOR_API_ROOT: int(os.getenv("TOPVISOR_POOL_MAXSIZE", POOL_MAXSIZE)),
+    AHREFS_API_ROOT: int(os.getenv("AHREFS_POOL_MAXSIZE", POOL_MAXSIZE)),
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+# httpx connections are bound to the event loop that opened them,
+# so async clients are kept per running loop and per API host
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _build_session():
+    session = requests.Session()
+    session.headers["Connection"] = "keep-alive"
+
+    default_adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE
+    )
+    session.mount("https://", default_adapter)
+    session.mount("http://", default_adapter)
+
+    # Longer prefixes win in requests, so every API host gets its own pool
+    for host, maxsize in HOST_POOL_MAXSIZE.items():
+        session.mount(host, HTTPAdapter(pool_connections=1, pool_maxsize=maxsize))
+
+    return session
+
+
+def get_session():
+    """Get the process-wide pooled keep-alive session shared by all API clients"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def close_session():
+    """Close pooled connections (the session is rebuilt on next use)"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_async_client(host):
+    """Get pooled keep-alive httpx client for given API host in the running loop"""
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(host)
+    if client is None or client.is_closed:
+        maxsize = HOST_POOL_MAXSIZE.get(host, POOL_MAXSIZE)
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=maxsize, max_keepalive_connections=maxsize
+            ),
+        )
+        clients[host] = client
+    return client
+
+
+async def close_async_clients():
+    """Close pooled async connections of the running loop"""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
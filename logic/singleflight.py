@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import weakref
+
+from logic.stats import record_coalesced
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent identical calls made from threads.
+
+    The first caller of a key executes the function, callers arriving while
+    it is in flight wait and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn):
+        """
+        Returns:
+            (result, shared), shared is True for callers that only waited
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            record_coalesced()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class AsyncSingleFlight:
+    """
+    Deduplicate concurrent identical coroutine calls within an event loop.
+
+    The call runs as a separate task, so cancelling one waiting caller does
+    not cancel the request for the others.
+    """
+
+    def __init__(self):
+        # Tasks are bound to their loop, every loop gets own in-flight table
+        self.calls = weakref.WeakKeyDictionary()
+
+    async def do(self, key, fn):
+        """
+        Args:
+            fn: Function returning a coroutine, called only by the first caller
+
+        Returns:
+            (result, shared), shared is True for callers that only waited
+        """
+        calls = self.calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        shared = task is not None
+        if shared:
+            record_coalesced()
+        else:
+            task = asyncio.ensure_future(fn())
+            calls[key] = task
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        return await asyncio.shield(task), shared
+
+
+# Process-wide in-flight tables of upstream requests
+inflight = SingleFlight()
+async_inflight = AsyncSingleFlight()
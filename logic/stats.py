@@ -0,0 +1,61 @@
+import contextvars
+from contextlib import contextmanager
+
+# Stats of the tool call being executed. asyncio tasks inherit the context,
+# so requests made by gathered pages, shards and regions count too
+_current_stats = contextvars.ContextVar("call_stats", default=None)
+
+
+class CallStats:
+    """Counters of upstream work done during one tool call"""
+
+    def __init__(self, name=None):
+        self.name = name
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.coalesced = 0
+
+    def as_dict(self):
+        return {
+            "retries": self.retries,
+            "cache": {"hits": self.cache_hits, "misses": self.cache_misses},
+            "coalesced": self.coalesced,
+        }
+
+
+@contextmanager
+def track_call(name=None):
+    """Collect CallStats for everything executed inside the block"""
+    stats = CallStats(name)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def current_stats():
+    """Get stats of the current tool call or None outside of track_call"""
+    return _current_stats.get()
+
+
+def record_retry():
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.retries += 1
+
+
+def record_cache(hit):
+    stats = _current_stats.get()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+def record_coalesced():
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.coalesced += 1
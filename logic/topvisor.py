@@ -1,80 +1,162 @@
+import asyncio
+import httpx
 import requests
 import json
 import csv
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 
+from logic.cache import (
+    cache_key,
+    credentials_id,
+    lookup_response,
+    lookup_response_async,
+    store_response,
+    store_response_async,
+)
+from logic.log import log_request_timing
+from logic.ratelimit import get_rate_limiter
+from logic.retry import RetryState
+from logic.session import TOPVISOR_API_ROOT, get_async_client, get_session
+from logic.singleflight import async_inflight, inflight
 from logic.utils import is_json
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Safety cap for automatic pagination of positions_2/history
+MAX_HISTORY_PAGES = int(os.getenv("TOPVISOR_MAX_HISTORY_PAGES", "100"))
+# Page size of positions_2/history requests in fetch_all mode
+HISTORY_PAGE_SIZE = int(os.getenv("TOPVISOR_HISTORY_PAGE_SIZE", "1000"))
+# positions_2/history periods longer than this are split into date shards
+HISTORY_SHARD_DAYS = int(os.getenv("TOPVISOR_HISTORY_SHARD_DAYS", "31"))
+# Max concurrent shard requests per history call without a shared limiter
+SHARD_CONCURRENCY = int(os.getenv("TOPVISOR_SHARD_CONCURRENCY", "4"))
+
 
 class TopvisorAPI:
     def __init__(
         self,
         user_id=os.getenv("TOPVISOR_USER_ID"),
         api_key=os.getenv("TOPVISOR_API_KEY"),
+        session=None,
     ):
         self.user_id = user_id
         self.api_key = api_key
         self.base_url = "https://api.topvisor.com/v2/json/get"
+        # Shared keep-alive connection pool unless a session is given explicitly
+        self.session = session or get_session()
 
         if not self.api_key:
             raise ValueError("API key Topvisor not found! ")
 
+        # Quota is shared by all clients (sync and async) with the same key
+        self.rate_limiter = get_rate_limiter("topvisor", self.api_key)
+
+        # Responses are cached per credentials
+        self.cache_namespace = credentials_id("topvisor", self.user_id, self.api_key)
+
         self.headers = {
             "Content-Type": "application/json",
-            "User-Id": self.user_id,
             "Authorization": f"bearer {self.api_key}",
         }
+        # requests drops None headers, httpx rejects them
+        if self.user_id:
+            self.headers["User-Id"] = self.user_id
 
-    def _make_request(self, endpoint, payload=None, csv=False):
+    def _send(self, endpoint, payload):
+        """Send request with rate limiting and retries, error dict on failure"""
         url = f"{self.base_url}/{endpoint}"
+        # Lazy formatting: nothing is serialized unless DEBUG is enabled.
+        # Headers are never logged, they contain the bearer token
+        logger.debug("Sending request %s payload=%s", url, payload)
+
+        retry = RetryState()
+        while True:
+            waited = self.rate_limiter.acquire()
+            if waited:
+                logger.debug("Rate limiter delayed %s by %.2fs", endpoint, waited)
+
+            started = time.perf_counter()
+            status = "error"
+            try:
+                response = self.session.post(
+                    url, headers=self.headers, json=payload, timeout=retry.timeout()
+                )
+                status = response.status_code
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response, error = None, e
+            except Exception as e:
+                logger.exception("Error while executing request %s", endpoint)
+                return {"error": f"Unexpected error: {str(e)}"}
+            finally:
+                log_request_timing("topvisor", endpoint, status, started)
+
+            delay = retry.next_delay(response)
+            if delay is None:
+                break
+            logger.info(
+                "Retry %s of %s in %.2fs after status=%s",
+                retry.attempt,
+                endpoint,
+                delay,
+                status,
+            )
+            time.sleep(delay)
 
-        # Debug request output
-        print(f"\nSending request:")
-        print(f"URL: {url}")
-        print(f"Headers: {json.dumps(self.headers, indent=2, ensure_ascii=False)}")
-        print(f"Payload: {json.dumps(payload, indent=2, ensure_ascii=False)}")
-
-        try:
-            response = requests.post(
-                url, headers=self.headers, json=payload, timeout=60
+        if response is None:
+            logger.warning(
+                "Connection error with Topvisor API (%s): %s", endpoint, error
             )
+            return {"error": "No internet connection or API unavailable"}
+        return response
 
-            # Debug response output
-            print(f"\nReceived response:")
-            print(f"Status Code: {response.status_code}")
-
-            if response.status_code == 200:
-                # response.text is CSV formatted string with semicolon delimiter
-                if csv:
-                    return {"result": response.text, "status_code": 200}
-                else:
-                    print(f"Successful API response")
-                    return response.json()
-            elif response.status_code == 401:
-                print(f"Authorization error: Check API key")
-                print(f"Error text: {response.text}")
-                return {"error": "Invalid API key", "status_code": 401}
-            elif response.status_code == 403:
-                print(f"Access denied: Insufficient permissions")
-                return {"error": "Insufficient access permissions", "status_code": 403}
-            else:
-                print(f"API error: {response.status_code}")
-                print(f"Error text: {response.text}")
-                return {
-                    "error": f"API error {response.status_code}",
-                    "details": response.text,
-                }
+    def _make_request(self, endpoint, payload=None, csv=False):
+        key, cached = lookup_response(self.cache_namespace, endpoint, payload)
+        if cached is not None:
+            return self._handle_response(cached, csv)
+
+        # Identical requests in flight share one upstream call
+        response, shared = inflight.do(
+            cache_key(self.cache_namespace, endpoint, payload),
+            lambda: self._send(endpoint, payload),
+        )
+        if isinstance(response, dict):
+            return dict(response)
+
+        result = self._handle_response(response, csv)
+        if not shared:
+            store_response(key, endpoint, payload, response, result)
+        return result
 
-        except requests.ConnectionError:
-            print(f"Connection error with Topvisor API")
-            return {"error": "No internet connection or API unavailable"}
-        except Exception as e:
-            print(f"An error occurred while executing request: {str(e)}")
-            return {"error": f"Unexpected error: {str(e)}"}
+    def _handle_response(self, response, csv=False):
+        """Convert requests/httpx response into result or error dict"""
+        logger.debug("Received response status=%s", response.status_code)
+
+        if response.status_code == 200:
+            # response.text is CSV formatted string with semicolon delimiter
+            if csv:
+                return {"result": response.text, "status_code": 200}
+            else:
+                return response.json()
+        elif response.status_code == 401:
+            logger.warning("Authorization error, check API key: %s", response.text)
+            return {"error": "Invalid API key", "status_code": 401}
+        elif response.status_code == 403:
+            logger.warning("Access denied: insufficient permissions")
+            return {"error": "Insufficient access permissions", "status_code": 403}
+        else:
+            logger.warning("API error %s: %s", response.status_code, response.text)
+            return {
+                "error": f"API error {response.status_code}",
+                "details": response.text,
+            }
 
     def get_projects(self):
         """Get user's projects list"""
@@ -94,6 +176,27 @@ class TopvisorAPI:
             payload["group_id"] = group_id
         return self._make_request("keywords_2/keywords", payload)
 
+    def _positions_payloads(
+        self, project_id, regions_indexes, date1, date2, limit, offset, shard_days
+    ):
+        """Build positions_2/history payloads, one per date shard"""
+        if date1 is None:
+            date1 = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+        if date2 is None:
+            date2 = datetime.now().strftime("%Y-%m-%d")
+
+        return [
+            {
+                "project_id": project_id,
+                "regions_indexes": regions_indexes,
+                "date1": shard_date1,
+                "date2": shard_date2,
+                "limit": limit,
+                "offset": offset,
+            }
+            for shard_date1, shard_date2 in split_date_range(date1, date2, shard_days)
+        ]
+
     def get_project_positions(
         self,
         project_id=4878567,
@@ -102,43 +205,35 @@ class TopvisorAPI:
         date2=None,
         limit=1000,
         offset=0,
+        shard_days=HISTORY_SHARD_DAYS,
     ):
-        """Get project keyword position history"""
-        if date1 is None:
-            date1 = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-        if date2 is None:
-            date2 = datetime.now().strftime("%Y-%m-%d")
-
-        payload = {
-            "project_id": project_id,
-            "regions_indexes": regions_indexes,
-            "date1": date1,
-            "date2": date2,
-            "limit": limit,
-            "offset": offset,
-        }
-
-        # Temporary debug information
-        print(f"🔍 Sending request positions_2/history:")
-        print(f"   Project ID: {project_id}")
-        print(f"   Period: {date1} - {date2}")
-        print(f"   Regions: {regions_indexes}")
-        print(f"   Limit: {limit}")
-
-        result = self._make_request("positions_2/history", payload)
-
-        print(f"📊 Result positions_2/history:")
-        print(f"   Response type: {type(result)}")
-        if isinstance(result, dict):
-            print(f"   Keys in response: {list(result.keys())}")
-            if "result" in result:
-                positions = result["result"]
-                print(
-                    f"   Number of positions: {len(positions) if hasattr(positions, '__len__') else 'unknown'}"
+        """
+        Get project keyword position history
+
+        Periods longer than shard_days are split into date shards that are
+        fetched in parallel and stitched back into one response.
+        """
+        payloads = self._positions_payloads(
+            project_id, regions_indexes, date1, date2, limit, offset, shard_days
+        )
+        if len(payloads) == 1:
+            return self._make_request("positions_2/history", payloads[0])
+
+        # Each worker runs in a copy of the caller context to keep call stats
+        contexts = [contextvars.copy_context() for _ in payloads]
+        with ThreadPoolExecutor(
+            max_workers=min(len(payloads), SHARD_CONCURRENCY)
+        ) as executor:
+            shards = list(
+                executor.map(
+                    lambda context, payload: context.run(
+                        self._make_request, "positions_2/history", payload
+                    ),
+                    contexts,
+                    payloads,
                 )
-                print(f"   Position data type: {type(positions)}")
-
-        return result
+            )
+        return merge_positions_shards(shards)
 
     def get_positions_summary(self, project_id, date1=None, date2=None):
         """Get project position summary"""
@@ -160,6 +255,12 @@ class TopvisorAPI:
         payload = {"project_id": project_id}
         
         response = self._make_request("positions_2/searchers_regions/export", payload, csv=True)
+        return self._parse_regions(response)
+
+    def _parse_regions(self, response):
+        """Parse semicolon-delimited regions export"""
+        if "result" not in response:
+            return response
 
         if is_json(response["result"]):
             error = json.loads(response["result"])
@@ -180,6 +281,34 @@ class TopvisorAPI:
         
         return {"result": data, "status_code": response.get("status_code", 200)}
 
+    def get_project_region_indexes(self, project_id):
+        """Get indexes of all project regions (used in regions_indexes)"""
+        response = self._make_request(
+            "projects_2/projects", self._region_indexes_payload(project_id)
+        )
+        return self._parse_region_indexes(response)
+
+    def _region_indexes_payload(self, project_id):
+        # The regions CSV export has no region index, project searchers have it
+        return {
+            "show_searchers_and_regions": 1,
+            "filters": [{"name": "id", "operator": "EQUALS", "values": [project_id]}],
+        }
+
+    def _parse_region_indexes(self, response):
+        """Collect region indexes from project searchers"""
+        if not isinstance(response.get("result"), list):
+            return response
+
+        indexes = []
+        for project in response["result"]:
+            for searcher in project.get("searchers") or []:
+                for region in searcher.get("regions") or []:
+                    index = region.get("index")
+                    if index is not None and str(index) not in indexes:
+                        indexes.append(str(index))
+        return {"result": indexes}
+
     def get_keyword_folders(self, project_id):
         """Get project keyword folders"""
         payload = {"project_id": project_id}
@@ -199,6 +328,288 @@ class TopvisorAPI:
         return self._make_request("bank_2/info", payload)
 
 
+class AsyncTopvisorAPI(TopvisorAPI):
+    """
+    Asyncio version of TopvisorAPI backed by a pooled httpx client.
+
+    Methods that only build a payload are inherited: they return the
+    coroutine of _make_request, so every API method is simply awaited.
+    """
+
+    async def _send(self, endpoint, payload):
+        """Send request with rate limiting and retries, error dict on failure"""
+        url = f"{self.base_url}/{endpoint}"
+        logger.debug("Sending request %s payload=%s", url, payload)
+
+        retry = RetryState()
+        while True:
+            waited = await self.rate_limiter.acquire_async()
+            if waited:
+                logger.debug("Rate limiter delayed %s by %.2fs", endpoint, waited)
+
+            started = time.perf_counter()
+            status = "error"
+            try:
+                client = get_async_client(TOPVISOR_API_ROOT)
+                response = await client.post(
+                    url, headers=self.headers, json=payload, timeout=retry.timeout()
+                )
+                status = response.status_code
+            except httpx.TransportError as e:
+                response, error = None, e
+            except Exception as e:
+                logger.exception("Error while executing request %s", endpoint)
+                return {"error": f"Unexpected error: {str(e)}"}
+            finally:
+                log_request_timing("topvisor", endpoint, status, started)
+
+            delay = retry.next_delay(response)
+            if delay is None:
+                break
+            logger.info(
+                "Retry %s of %s in %.2fs after status=%s",
+                retry.attempt,
+                endpoint,
+                delay,
+                status,
+            )
+            await asyncio.sleep(delay)
+
+        if response is None:
+            logger.warning(
+                "Connection error with Topvisor API (%s): %s", endpoint, error
+            )
+            return {"error": "No internet connection or API unavailable"}
+        return response
+
+    async def _make_request(self, endpoint, payload=None, csv=False):
+        key, cached = await lookup_response_async(
+            self.cache_namespace, endpoint, payload
+        )
+        if cached is not None:
+            return self._handle_response(cached, csv)
+
+        # Identical requests in flight share one upstream call
+        response, shared = await async_inflight.do(
+            cache_key(self.cache_namespace, endpoint, payload),
+            lambda: self._send(endpoint, payload),
+        )
+        if isinstance(response, dict):
+            return dict(response)
+
+        result = self._handle_response(response, csv)
+        if not shared:
+            await store_response_async(key, endpoint, payload, response, result)
+        return result
+
+    async def get_project_positions(
+        self,
+        project_id=4878567,
+        regions_indexes=["33"],
+        date1=None,
+        date2=None,
+        limit=1000,
+        offset=0,
+        shard_days=HISTORY_SHARD_DAYS,
+        limiter=None,
+    ):
+        """
+        Get project keyword position history
+
+        Periods longer than shard_days are split into date shards that are
+        fetched concurrently and stitched back into one response.
+
+        limiter is an asyncio.Semaphore held by every single request; callers
+        pass one shared limiter to cap shards, pages and regions together
+        (default - SHARD_CONCURRENCY requests of this call).
+        """
+        payloads = self._positions_payloads(
+            project_id, regions_indexes, date1, date2, limit, offset, shard_days
+        )
+        if limiter is None:
+            limiter = asyncio.Semaphore(SHARD_CONCURRENCY)
+
+        async def fetch_shard(payload):
+            async with limiter:
+                return await self._make_request("positions_2/history", payload)
+
+        if len(payloads) == 1:
+            return await fetch_shard(payloads[0])
+
+        shards = await asyncio.gather(*(fetch_shard(p) for p in payloads))
+        return merge_positions_shards(shards)
+
+    async def get_project_regions(self, project_id):
+        """Get project regions and search engines"""
+        payload = {"project_id": project_id}
+        response = await self._make_request(
+            "positions_2/searchers_regions/export", payload, csv=True
+        )
+        return self._parse_regions(response)
+
+    async def get_project_region_indexes(self, project_id):
+        """Get indexes of all project regions (used in regions_indexes)"""
+        response = await self._make_request(
+            "projects_2/projects", self._region_indexes_payload(project_id)
+        )
+        return self._parse_region_indexes(response)
+
+    async def get_all_project_positions(
+        self,
+        project_id,
+        regions_indexes=["33"],
+        date1=None,
+        date2=None,
+        page_size=HISTORY_PAGE_SIZE,
+        max_concurrency=4,
+        max_pages=MAX_HISTORY_PAGES,
+        limiter=None,
+    ):
+        """
+        Get project keyword position history for all keywords.
+
+        The first page is fetched alone; if it is full, further pages are
+        requested in waves of max_concurrency pages until a page comes back
+        short. Pages are merged into one response, marked as truncated when
+        max_pages is reached before the last page. Requests of all pages and
+        their date shards share limiter (default - max_concurrency requests).
+        """
+        max_concurrency = max(1, max_concurrency)
+        if limiter is None:
+            limiter = asyncio.Semaphore(max_concurrency)
+        first = await self.get_project_positions(
+            project_id, regions_indexes, date1, date2, page_size, 0, limiter=limiter
+        )
+        pages = [first]
+
+        while (
+            _is_full_positions_page(pages[-1], page_size) and len(pages) < max_pages
+        ):
+            offsets = [
+                (len(pages) + i) * page_size
+                for i in range(min(max_concurrency, max_pages - len(pages)))
+            ]
+            wave = await asyncio.gather(
+                *(
+                    self.get_project_positions(
+                        project_id,
+                        regions_indexes,
+                        date1,
+                        date2,
+                        page_size,
+                        offset,
+                        limiter=limiter,
+                    )
+                    for offset in offsets
+                )
+            )
+            for page in wave:
+                pages.append(page)
+                if not _is_full_positions_page(page, page_size):
+                    break
+
+        return merge_positions_pages(pages, page_size)
+
+
+def _positions_keywords(page):
+    result = page.get("result") if isinstance(page, dict) else None
+    if isinstance(result, dict) and isinstance(result.get("keywords"), list):
+        return result["keywords"]
+    return None
+
+
+def _is_full_positions_page(page, page_size):
+    keywords = _positions_keywords(page)
+    return keywords is not None and len(keywords) >= page_size
+
+
+def split_date_range(date1, date2, shard_days):
+    """Split YYYY-MM-DD period into consecutive shards of at most shard_days"""
+    if not shard_days or shard_days <= 0:
+        return [(date1, date2)]
+
+    start = datetime.strptime(date1, "%Y-%m-%d")
+    end = datetime.strptime(date2, "%Y-%m-%d")
+    shards = []
+    while start <= end:
+        shard_end = min(start + timedelta(days=shard_days - 1), end)
+        shards.append((start.strftime("%Y-%m-%d"), shard_end.strftime("%Y-%m-%d")))
+        start = shard_end + timedelta(days=1)
+    return shards or [(date1, date2)]
+
+
+def merge_positions_shards(shards):
+    """
+    Stitch positions_2/history responses for date shards of the same period.
+
+    Keywords are matched by id (name as fallback) and their positionsData
+    dicts are united, so every keyword gets positions for all dates.
+    The first failed shard is returned as is.
+    """
+    for shard in shards:
+        if _positions_keywords(shard) is None:
+            return shard
+
+    merged = dict(shards[0])
+    merged["result"] = dict(shards[0]["result"])
+    keywords = {}
+    for shard in shards:
+        for keyword in _positions_keywords(shard):
+            key = keyword.get("id", keyword.get("name"))
+            if key not in keywords:
+                keywords[key] = dict(keyword)
+                keywords[key]["positionsData"] = dict(
+                    keyword.get("positionsData") or {}
+                )
+            else:
+                keywords[key]["positionsData"].update(
+                    keyword.get("positionsData") or {}
+                )
+    merged["result"]["keywords"] = list(keywords.values())
+
+    dates = set()
+    for shard in shards:
+        headers = shard["result"].get("headers")
+        if isinstance(headers, dict) and isinstance(headers.get("dates"), list):
+            dates.update(headers["dates"])
+    if dates:
+        merged["result"]["headers"] = {
+            **merged["result"].get("headers", {}),
+            "dates": sorted(dates),
+        }
+    return merged
+
+
+def merge_positions_pages(pages, page_size):
+    """
+    Merge positions_2/history pages into the first page.
+
+    The first failed page is returned as is, so callers never get
+    silently truncated data. Merged response gets a "pages" counter; if the
+    last page is still full (page cap reached), also "truncated" and the
+    "next_offset" to continue from.
+    """
+    for page in pages:
+        if _positions_keywords(page) is None:
+            return page
+
+    merged = dict(pages[0])
+    merged["result"] = dict(pages[0]["result"])
+    merged["result"]["keywords"] = [
+        keyword for page in pages for keyword in _positions_keywords(page)
+    ]
+    merged["pages"] = len(pages)
+    if _is_full_positions_page(pages[-1], page_size):
+        logger.warning(
+            "positions_2/history stopped at the page cap (%d pages of %d)",
+            len(pages),
+            page_size,
+        )
+        merged["truncated"] = True
+        merged["next_offset"] = len(pages) * page_size
+    return merged
+
+
 # if __name__ == "__main__":
 #     topvisor = TopvisorAPI()
 #     print(topvisor.get_project_keywords(project_id=18788866, folder_id=None, group_id=50348785))
@@ -0,0 +1,351 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from logic.disk_cache import CACHE_DIR
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    project_id INTEGER PRIMARY KEY,
+    name TEXT,
+    url TEXT
+);
+CREATE TABLE IF NOT EXISTS regions (
+    project_id INTEGER NOT NULL,
+    region_index TEXT NOT NULL,
+    PRIMARY KEY (project_id, region_index)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    project_id INTEGER NOT NULL,
+    region_index TEXT NOT NULL,
+    last_date TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    PRIMARY KEY (project_id, region_index)
+);
+CREATE TABLE IF NOT EXISTS keywords (
+    project_id INTEGER NOT NULL,
+    keyword_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    folder_id INTEGER,
+    group_id INTEGER,
+    PRIMARY KEY (project_id, keyword_id)
+);
+CREATE TABLE IF NOT EXISTS positions (
+    project_id INTEGER NOT NULL,
+    region_index TEXT NOT NULL,
+    keyword_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    position TEXT NOT NULL,
+    position_numeric INTEGER,
+    PRIMARY KEY (project_id, region_index, keyword_id, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS positions_project_region_date
+    ON positions (project_id, region_index, date);
+CREATE INDEX IF NOT EXISTS positions_keyword_date
+    ON positions (keyword_id, date);
+CREATE INDEX IF NOT EXISTS keywords_folder ON keywords (project_id, folder_id);
+CREATE INDEX IF NOT EXISTS keywords_group ON keywords (project_id, group_id);
+"""
+
+# Grouping of position stats -> (selected columns, GROUP BY, ORDER BY)
+STATS_GROUPS = {
+    None: ("", "", ""),
+    "date": ("p.date AS date, ", "GROUP BY p.date", "ORDER BY p.date"),
+    "region": (
+        "p.region_index AS region_index, ",
+        "GROUP BY p.region_index",
+        "ORDER BY p.region_index",
+    ),
+    "keyword": (
+        "p.keyword_id AS keyword_id, k.name AS keyword_name, ",
+        "GROUP BY p.keyword_id",
+        "ORDER BY avg_position IS NULL, avg_position",
+    ),
+    "folder": (
+        "k.folder_id AS folder_id, ",
+        "GROUP BY k.folder_id",
+        "ORDER BY k.folder_id",
+    ),
+    "group": ("k.group_id AS group_id, ", "GROUP BY k.group_id", "ORDER BY k.group_id"),
+}
+
+
+class PositionsWarehouse:
+    """
+    Local SQLite warehouse of Topvisor projects, keywords, regions and daily
+    positions. Fed by the Topvisor tools, queried by the warehouse tools.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return [
+                dict(row) for row in self.connection.execute(sql, params).fetchall()
+            ]
+
+    def last_synced(self, project_id, region_index):
+        """Last synced date (YYYY-MM-DD) of project region or None"""
+        rows = self._query(
+            "SELECT last_date FROM sync_state WHERE project_id = ? AND region_index = ?",
+            (project_id, str(region_index)),
+        )
+        return rows[0]["last_date"] if rows else None
+
+    def store_projects(self, projects):
+        """Upsert projects, dicts with id, name and url"""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO projects (project_id, name, url) VALUES (?, ?, ?)"
+                " ON CONFLICT (project_id) DO UPDATE"
+                " SET name = excluded.name, url = excluded.url",
+                [
+                    (project["id"], project.get("name"), project.get("url"))
+                    for project in projects
+                    if project.get("id") is not None
+                ],
+            )
+
+    def store_keywords(self, project_id, keywords):
+        """Upsert keywords, dicts with id, name, folder_id and group_id"""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO keywords (project_id, keyword_id, name, folder_id, group_id)"
+                " VALUES (?, ?, ?, ?, ?) ON CONFLICT (project_id, keyword_id) DO UPDATE"
+                " SET name = excluded.name, folder_id = excluded.folder_id,"
+                " group_id = excluded.group_id",
+                [
+                    (
+                        project_id,
+                        keyword["id"],
+                        keyword.get("name") or "",
+                        keyword.get("folder_id"),
+                        keyword.get("group_id"),
+                    )
+                    for keyword in keywords
+                    if keyword.get("id") is not None
+                ],
+            )
+
+    def store_positions(self, project_id, records, synced=None):
+        """
+        Upsert positions in one transaction, optionally moving sync marks.
+
+        Args:
+            records: Iterable of (region_index, keyword_id, keyword_name, date, position)
+            synced: Optional {region_index: date the region is synced up to}
+
+        Returns:
+            Number of stored positions
+        """
+        keywords = {}
+        regions = set(str(region_index) for region_index in synced or {})
+        positions = []
+        for region_index, keyword_id, keyword_name, date, position in records:
+            keywords[keyword_id] = keyword_name
+            regions.add(region_index)
+            positions.append(
+                (
+                    project_id,
+                    region_index,
+                    keyword_id,
+                    date,
+                    position,
+                    int(position) if position.isdigit() else None,
+                )
+            )
+
+        synced_at = datetime.now().isoformat(timespec="seconds")
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO projects (project_id) VALUES (?)", (project_id,)
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO regions (project_id, region_index) VALUES (?, ?)",
+                [(project_id, region_index) for region_index in regions],
+            )
+            # Names only: folder and group come from the keywords sync
+            self.connection.executemany(
+                "INSERT INTO keywords (project_id, keyword_id, name) VALUES (?, ?, ?)"
+                " ON CONFLICT (project_id, keyword_id) DO UPDATE SET name = excluded.name",
+                [(project_id, keyword_id, name) for keyword_id, name in keywords.items()],
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO positions (project_id, region_index, keyword_id,"
+                " date, position, position_numeric) VALUES (?, ?, ?, ?, ?, ?)",
+                positions,
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO sync_state"
+                " (project_id, region_index, last_date, synced_at) VALUES (?, ?, ?, ?)",
+                [
+                    (project_id, str(region_index), last_date, synced_at)
+                    for region_index, last_date in (synced or {}).items()
+                ],
+            )
+        return len(positions)
+
+    def position_stats(
+        self,
+        project_id,
+        region_index=None,
+        date1=None,
+        date2=None,
+        folder_id=None,
+        group_id=None,
+        keyword_id=None,
+        group_by=None,
+        limit=100,
+    ):
+        """
+        Aggregate stored positions. Averages, best/worst and top shares only
+        count ranking positions, not ranking ones are counted separately.
+        """
+        if group_by not in STATS_GROUPS:
+            raise ValueError(
+                f"Unknown group_by: {group_by}, expected one of "
+                + ", ".join(str(group) for group in STATS_GROUPS)
+            )
+        select, group, order = STATS_GROUPS[group_by]
+
+        conditions = ["p.project_id = ?"]
+        params = [project_id]
+        for condition, value in (
+            ("p.region_index = ?", None if region_index is None else str(region_index)),
+            ("p.date >= ?", date1),
+            ("p.date <= ?", date2),
+            ("k.folder_id = ?", folder_id),
+            ("k.group_id = ?", group_id),
+            ("p.keyword_id = ?", keyword_id),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+
+        sql = f"""
+            SELECT {select}
+                COUNT(*) AS positions,
+                COUNT(p.position_numeric) AS ranking,
+                COUNT(*) - COUNT(p.position_numeric) AS not_ranking,
+                ROUND(AVG(p.position_numeric), 2) AS avg_position,
+                MIN(p.position_numeric) AS best_position,
+                MAX(p.position_numeric) AS worst_position,
+                COALESCE(SUM(p.position_numeric <= 3), 0) AS top3,
+                COALESCE(SUM(p.position_numeric <= 10), 0) AS top10,
+                COUNT(DISTINCT p.keyword_id) AS keywords,
+                MIN(p.date) AS first_date,
+                MAX(p.date) AS last_date
+            FROM positions p
+            LEFT JOIN keywords k
+                ON k.project_id = p.project_id AND k.keyword_id = p.keyword_id
+            WHERE {" AND ".join(conditions)}
+            {group}
+            {order}
+            LIMIT ?
+        """
+        return self._query(sql, (*params, max(1, limit)))
+
+    def position_changes(self, project_id, region_index, date1, date2, limit=20):
+        """
+        Compare keyword positions of a region between two dates.
+
+        Returns:
+            Dict with counts and top improved/declined keywords; change is
+            positive when the keyword moved up
+        """
+        rows = self._query(
+            """
+            SELECT p2.keyword_id AS keyword_id, k.name AS keyword_name,
+                p1.position AS position_before, p2.position AS position_after,
+                p1.position_numeric - p2.position_numeric AS change,
+                p1.position_numeric IS NULL AS was_not_ranking,
+                p2.position_numeric IS NULL AS is_not_ranking
+            FROM positions p2
+            JOIN positions p1
+                ON p1.project_id = p2.project_id
+                AND p1.region_index = p2.region_index
+                AND p1.keyword_id = p2.keyword_id
+                AND p1.date = ?
+            LEFT JOIN keywords k
+                ON k.project_id = p2.project_id AND k.keyword_id = p2.keyword_id
+            WHERE p2.project_id = ? AND p2.region_index = ? AND p2.date = ?
+            """,
+            (date1, project_id, str(region_index), date2),
+        )
+
+        changed = [row for row in rows if row["change"]]
+        improved = sorted(
+            (row for row in changed if row["change"] > 0),
+            key=lambda row: -row["change"],
+        )
+        declined = sorted(
+            (row for row in changed if row["change"] < 0),
+            key=lambda row: row["change"],
+        )
+        return {
+            "compared_keywords": len(rows),
+            "improved_count": len(improved),
+            "declined_count": len(declined),
+            "entered_ranking": sum(
+                1 for row in rows if row["was_not_ranking"] and not row["is_not_ranking"]
+            ),
+            "left_ranking": sum(
+                1 for row in rows if row["is_not_ranking"] and not row["was_not_ranking"]
+            ),
+            "improved": improved[:limit],
+            "declined": declined[:limit],
+        }
+
+    def coverage(self, project_id=None):
+        """Stored date ranges and sizes per project region"""
+        condition, params = "", ()
+        if project_id is not None:
+            condition, params = "WHERE r.project_id = ?", (project_id,)
+        return self._query(
+            f"""
+            SELECT r.project_id AS project_id, pr.name AS project_name,
+                r.region_index AS region_index, s.last_date AS last_synced,
+                s.synced_at AS synced_at,
+                (SELECT MIN(date) FROM positions p
+                    WHERE p.project_id = r.project_id
+                    AND p.region_index = r.region_index) AS first_date,
+                (SELECT MAX(date) FROM positions p
+                    WHERE p.project_id = r.project_id
+                    AND p.region_index = r.region_index) AS last_date,
+                (SELECT COUNT(*) FROM positions p
+                    WHERE p.project_id = r.project_id
+                    AND p.region_index = r.region_index) AS positions
+            FROM regions r
+            LEFT JOIN projects pr ON pr.project_id = r.project_id
+            LEFT JOIN sync_state s
+                ON s.project_id = r.project_id AND s.region_index = r.region_index
+            {condition}
+            ORDER BY r.project_id, r.region_index
+            """,
+            params,
+        )
+
+
+_warehouse = None
+_warehouse_lock = threading.Lock()
+
+
+def get_warehouse():
+    """Get shared positions warehouse stored under SEO_CACHE_DIR"""
+    global _warehouse
+    if _warehouse is None:
+        with _warehouse_lock:
+            if _warehouse is None:
+                _warehouse = PositionsWarehouse(
+                    os.path.join(CACHE_DIR, "positions.sqlite3")
+                )
+    return _warehouse
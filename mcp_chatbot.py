@@ -1,21 +1,153 @@
 from dotenv import load_dotenv
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 from contextlib import AsyncExitStack
 import json
+import os
 import asyncio
-import nest_asyncio
-
-nest_asyncio.apply()
 
 load_dotenv()
 
+# Print model text as it streams and start tools before the message is complete
+STREAM_RESPONSES = os.getenv("CHATBOT_STREAM", "1") != "0"
+# Mark tool definitions and conversation prefix as cacheable (prompt caching)
+PROMPT_CACHE = os.getenv("CHATBOT_PROMPT_CACHE", "1") != "0"
+
+# Longest tool result kept in the conversation, characters; longer JSON results
+# are summarized and other text is truncated
+TOOL_RESULT_MAX_CHARS = int(os.getenv("CHATBOT_TOOL_RESULT_MAX_CHARS", "20000"))
+# Estimated conversation size in tokens; before a request above it older tool
+# results are replaced by summaries
+CONTEXT_BUDGET_TOKENS = int(os.getenv("CHATBOT_CONTEXT_BUDGET_TOKENS", "60000"))
+# Rough token size used for budget estimates
+CHARS_PER_TOKEN = 4
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def with_cache_breakpoint(message):
+    """Copy of message whose last content block is marked as cacheable"""
+    content = message["content"]
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    if not content or not isinstance(content[-1], dict):
+        return message
+    return {
+        **message,
+        "content": [*content[:-1], {**content[-1], "cache_control": CACHE_CONTROL}],
+    }
+
+
+def summarize_value(value, keep_items, depth=0):
+    """Shrink JSON value: lists keep first keep_items items, deep objects are dropped"""
+    if isinstance(value, list):
+        if len(value) <= keep_items:
+            return [summarize_value(item, keep_items, depth + 1) for item in value]
+        kept = value[:keep_items]
+        return [
+            *(summarize_value(item, keep_items, depth + 1) for item in kept),
+            f"... {len(value) - keep_items} more items omitted",
+        ]
+    if isinstance(value, dict):
+        if depth >= 3:
+            return f"<object with {len(value)} keys omitted>"
+        return {
+            key: summarize_value(item, keep_items, depth + 1)
+            for key, item in value.items()
+        }
+    if isinstance(value, str) and len(value) > 300:
+        return value[:300] + "..."
+    return value
+
+
+def compact_tool_text(text, max_chars, keep_items):
+    """
+    Shrink tool result text. JSON responses keep their status, counts, stats
+    and dataset handles while lists are cut; other text is truncated.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+
+    if isinstance(data, dict):
+        summary = summarize_value(data, keep_items)
+        if "dataset_handle" in data:
+            summary["note"] = (
+                "Rows omitted to save context, query them with query_dataset"
+                " and this dataset_handle"
+            )
+        else:
+            summary["note"] = (
+                "Lists shortened to save context, call the tool again with"
+                " narrower parameters if more details are needed"
+            )
+        text = json.dumps(summary, ensure_ascii=False)
+
+    if len(text) > max_chars:
+        text = f"{text[:max_chars]}\n... [{len(text) - max_chars} characters truncated]"
+    return text
+
+
+def content_chars(content):
+    """Approximate serialized size of message content"""
+    if isinstance(content, str):
+        return len(content)
+    size = 0
+    for block in content:
+        if isinstance(block, dict):
+            size += len(json.dumps(block, ensure_ascii=False, default=str))
+        elif hasattr(block, "model_dump_json"):
+            size += len(block.model_dump_json())
+        else:
+            size += len(str(block))
+    return size
+
+
+def estimate_tokens(messages):
+    chars = sum(content_chars(message["content"]) for message in messages)
+    return chars // CHARS_PER_TOKEN
+
+
+def compact_messages(messages, budget_tokens):
+    """
+    Replace tool results with summaries, oldest first, until the conversation
+    fits budget_tokens. Results of the newest message are kept.
+
+    Returns:
+        (compacted results count, estimated tokens before, after)
+    """
+    before = size = estimate_tokens(messages)
+    summary_chars = TOOL_RESULT_MAX_CHARS // 10
+    compacted = 0
+    for message in messages[:-1]:
+        if size <= budget_tokens:
+            break
+        if message["role"] != "user" or isinstance(message["content"], str):
+            continue
+        for block in message["content"]:
+            if not (isinstance(block, dict) and block.get("type") == "tool_result"):
+                continue
+            for item in block["content"]:
+                if not (isinstance(item, dict) and item.get("type") == "text"):
+                    continue
+                # Small and already summarized results (with truncation note) stay
+                if len(item["text"]) <= summary_chars + 64:
+                    continue
+                summary = compact_tool_text(item["text"], summary_chars, keep_items=0)
+                if len(summary) < len(item["text"]):
+                    size -= (len(item["text"]) - len(summary)) // CHARS_PER_TOKEN
+                    item["text"] = summary
+                    compacted += 1
+    return compacted, before, size
+
 
 class MCP_ChatBot:
     def __init__(self):
         self.exit_stack = AsyncExitStack()
-        self.anthropic = Anthropic()
+        # Async client: the event loop keeps serving MCP sessions during model calls
+        self.anthropic = AsyncAnthropic()
         # Tools list required for Anthropic API
         self.available_tools = []
         # Prompts list for quick display
@@ -84,55 +216,132 @@ class MCP_ChatBot:
             print(f"Error loading server config: {e}")
             raise
 
-    async def process_query(self, query):
-        messages = [{"role": "user", "content": query}]
+    async def call_tool(self, tool_use):
+        """Call tool of a tool_use block in its MCP session and build tool_result"""
+        session = self.sessions.get(tool_use.name)
+        if not session:
+            print(f"Tool '{tool_use.name}' not found.")
+            return {
+                "type": "tool_result",
+                "tool_use_id": tool_use.id,
+                "content": f"Tool '{tool_use.name}' not found",
+                "is_error": True,
+            }
 
-        while True:
-            response = self.anthropic.messages.create(
-                max_tokens=2024,
-                model="claude-3-7-sonnet-20250219",
-                tools=self.available_tools,
-                messages=messages,
-            )
+        try:
+            result = await session.call_tool(tool_use.name, arguments=tool_use.input)
+        except Exception as e:
+            print(f"Error calling {tool_use.name}: {e}")
+            return {
+                "type": "tool_result",
+                "tool_use_id": tool_use.id,
+                "content": f"Error calling {tool_use.name}: {e}",
+                "is_error": True,
+            }
+
+        # Oversized results are capped before they enter the conversation
+        content = []
+        for item in result.content:
+            if item.type == "text":
+                text = item.text
+                if len(text) > TOOL_RESULT_MAX_CHARS:
+                    text = compact_tool_text(
+                        text, TOOL_RESULT_MAX_CHARS, keep_items=20
+                    )
+                content.append({"type": "text", "text": text})
+            else:
+                content.append(item)
+
+        return {"type": "tool_result", "tool_use_id": tool_use.id, "content": content}
 
-            assistant_content = []
-            has_tool_use = False
+    async def request_turn(self, messages):
+        """
+        Get next assistant message, printing its text and starting its tool calls.
 
+        In streaming mode text is printed as it arrives and every tool starts as
+        soon as its tool_use block is complete, while the rest still streams.
+
+        Returns:
+            (message, tasks of tool calls in tool_use order)
+        """
+        compacted, before, after = compact_messages(messages, CONTEXT_BUDGET_TOKENS)
+        if compacted:
+            print(
+                f"[context] summarized {compacted} older tool results,"
+                f" ~{before} -> ~{after} tokens"
+            )
+
+        tools = self.available_tools
+        if PROMPT_CACHE and tools and messages:
+            # Two breakpoints: the stable tool catalog, and everything up to the
+            # newest message, which the next turn of this query reads back
+            tools = [*tools[:-1], {**tools[-1], "cache_control": CACHE_CONTROL}]
+            messages = [*messages[:-1], with_cache_breakpoint(messages[-1])]
+
+        request = {
+            "max_tokens": 2024,
+            "model": "claude-3-7-sonnet-20250219",
+            "tools": tools,
+            "messages": messages,
+        }
+        tool_tasks = []
+
+        if not STREAM_RESPONSES:
+            response = await self.anthropic.messages.create(**request)
+            self.print_usage(response.usage)
             for content in response.content:
                 if content.type == "text":
                     print(content.text)
-                    assistant_content.append(content)
                 elif content.type == "tool_use":
-                    has_tool_use = True
-                    assistant_content.append(content)
-                    messages.append({"role": "assistant", "content": assistant_content})
-
-                    # Get session and call tool
-                    session = self.sessions.get(content.name)
-                    if not session:
-                        print(f"Tool '{content.name}' not found.")
-                        break
-
-                    result = await session.call_tool(
-                        content.name, arguments=content.input
-                    )
-                    messages.append(
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "tool_result",
-                                    "tool_use_id": content.id,
-                                    "content": result.content,
-                                }
-                            ],
-                        }
-                    )
+                    tool_tasks.append(asyncio.create_task(self.call_tool(content)))
+            return response, tool_tasks
+
+        try:
+            async with self.anthropic.messages.stream(**request) as stream:
+                async for event in stream:
+                    if event.type == "text":
+                        print(event.text, end="", flush=True)
+                    elif event.type == "content_block_stop":
+                        block = event.content_block
+                        if block.type == "text":
+                            print()
+                        elif block.type == "tool_use":
+                            tool_tasks.append(
+                                asyncio.create_task(self.call_tool(block))
+                            )
+                response = await stream.get_final_message()
+            self.print_usage(response.usage)
+        except BaseException:
+            for task in tool_tasks:
+                task.cancel()
+            raise
+        return response, tool_tasks
+
+    def print_usage(self, usage):
+        """Print token usage of a turn including prompt cache reads and writes"""
+        print(
+            f"[tokens] input={usage.input_tokens}"
+            f" cache_read={usage.cache_read_input_tokens or 0}"
+            f" cache_write={usage.cache_creation_input_tokens or 0}"
+            f" output={usage.output_tokens}"
+        )
+
+    async def process_query(self, query):
+        messages = [{"role": "user", "content": query}]
+
+        while True:
+            response, tool_tasks = await self.request_turn(messages)
 
             # Exit loop if no tool was used
-            if not has_tool_use:
+            if not tool_tasks:
                 break
 
+            messages.append({"role": "assistant", "content": response.content})
+
+            # All tools of a turn run concurrently, results go back in one message
+            tool_results = await asyncio.gather(*tool_tasks)
+            messages.append({"role": "user", "content": list(tool_results)})
+
     async def get_resource(self, resource_uri):
         session = self.sessions.get(resource_uri)
 
@@ -376,7 +585,8 @@ For organic: best_position:asc, volume:desc, keyword_difficulty:asc
 
         while True:
             try:
-                query = input("\nQuery: ").strip()
+                # Reading stdin in a thread keeps the event loop running meanwhile
+                query = (await asyncio.to_thread(input, "\nQuery: ")).strip()
                 if not query:
                     continue
 
@@ -527,6 +737,7 @@ For organic: best_position:asc, volume:desc, keyword_difficulty:asc
 
     async def cleanup(self):
         await self.exit_stack.aclose()
+        await self.anthropic.close()
 
 
 async def main():
@@ -2,6 +2,8 @@ import os
 from fastmcp import FastMCP
 from dotenv import load_dotenv
 
+from logic.log import setup_logging
+
 # Import Topvisor tools from the tools module
 from tools.topvisor import (
     check_topvisor_setup,
@@ -15,6 +17,7 @@ from tools.topvisor import (
     get_topvisor_keyword_groups,
     get_topvisor_balance,
     get_topvisor_project_keywords,
+    sync_topvisor_positions,
 )
 
 # Import Ahrefs tools from the tools module
@@ -23,10 +26,26 @@ from tools.ahrefs import (
     get_ahrefs_refdomains,
     get_ahrefs_backlinks,
     get_ahrefs_organic_keywords,
+    get_ahrefs_refdomains_bulk,
+    get_ahrefs_backlinks_bulk,
+    get_ahrefs_organic_keywords_bulk,
+)
+
+# Import local positions warehouse tools from the tools module
+from tools.warehouse import (
+    get_warehouse_coverage,
+    get_warehouse_position_stats,
+    get_warehouse_position_changes,
 )
 
+# Import dataset query tool from the tools module
+from tools.datasets import query_dataset
+
 load_dotenv()
 
+# Logs go to stderr or SEO_LOG_FILE, stdout is reserved for the stdio transport
+setup_logging()
+
 PAPER_DIR = "papers"
 
 # Initialize FastMCP server
@@ -44,12 +63,24 @@ mcp.tool(get_topvisor_keyword_folders)
 mcp.tool(get_topvisor_keyword_groups)
 mcp.tool(get_topvisor_balance)
 mcp.tool(get_topvisor_project_keywords)
+mcp.tool(sync_topvisor_positions)
 
 # Register Ahrefs tools
 mcp.tool(check_ahrefs_setup)
 mcp.tool(get_ahrefs_refdomains)
 mcp.tool(get_ahrefs_backlinks)
 mcp.tool(get_ahrefs_organic_keywords)
+mcp.tool(get_ahrefs_refdomains_bulk)
+mcp.tool(get_ahrefs_backlinks_bulk)
+mcp.tool(get_ahrefs_organic_keywords_bulk)
+
+# Register local positions warehouse tools
+mcp.tool(get_warehouse_coverage)
+mcp.tool(get_warehouse_position_stats)
+mcp.tool(get_warehouse_position_changes)
+
+# Register dataset query tool
+mcp.tool(query_dataset)
 
 if __name__ == "__main__":
     # Initialize and run the server
@@ -1,12 +1,19 @@
-import json
+import asyncio
 import os
 from typing import Optional
-from logic.ahrefs import AhrefsAPI
+from logic.clients import get_async_ahrefs_client
 from dotenv import load_dotenv
 
+from tools.utils import dataset_fields, to_json, tool_call
+
 load_dotenv()
 
-def check_ahrefs_setup() -> str:
+# Default number of concurrent Ahrefs requests in bulk tools
+BULK_CONCURRENCY = int(os.getenv("AHREFS_BULK_CONCURRENCY", "5"))
+
+
+@tool_call
+async def check_ahrefs_setup() -> str:
     """
     Check Ahrefs API setup and connection.
 
@@ -18,7 +25,7 @@ def check_ahrefs_setup() -> str:
         api_key = os.getenv("AHREFS_API_KEY")
 
         if not api_key:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": "API key not found",
@@ -30,17 +37,16 @@ def check_ahrefs_setup() -> str:
                     "help": "Create .env file and add AHREFS_API_KEY=your_key",
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
         # Check API connection
         try:
-            ahrefs = AhrefsAPI()
+            ahrefs = get_async_ahrefs_client()
             # Simple test request to get referring domains
-            result = ahrefs.get_refdomains("example.com", limit=1)
+            result = await ahrefs.get_refdomains("example.com", limit=1)
 
             if result and "error" in result:
-                return json.dumps(
+                return to_json(
                     {
                         "status": "warning",
                         "message": f'API key found, but there is a problem: {result["error"]}',
@@ -52,10 +58,9 @@ def check_ahrefs_setup() -> str:
                         "help": "Check API key validity and account balance",
                     },
                     indent=2,
-                    ensure_ascii=False,
                 )
             elif result and "refdomains" in result:
-                return json.dumps(
+                return to_json(
                     {
                         "status": "success",
                         "message": "Everything is set up correctly! Ahrefs API is working",
@@ -67,10 +72,9 @@ def check_ahrefs_setup() -> str:
                         "test_result": "Test request successful",
                     },
                     indent=2,
-                    ensure_ascii=False,
                 )
             else:
-                return json.dumps(
+                return to_json(
                     {
                         "status": "error",
                         "message": "Unexpected response from API",
@@ -82,11 +86,10 @@ def check_ahrefs_setup() -> str:
                         "raw_result": str(result)[:500] if result else "None",
                     },
                     indent=2,
-                    ensure_ascii=False,
                 )
 
         except Exception as api_error:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": f"API connection error: {str(api_error)}",
@@ -99,23 +102,22 @@ def check_ahrefs_setup() -> str:
                     "help": "Check internet connection and API key validity",
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {
                 "status": "error",
                 "message": f"Setup check error: {str(e)}",
                 "help": "Make sure API key is added to .env file",
             },
             indent=2,
-            ensure_ascii=False,
         )
 
 
-def get_ahrefs_refdomains(
-    target: str, limit: int = 100
+@tool_call
+async def get_ahrefs_refdomains(
+    target: str, limit: int = 100, dataset_only: bool = False
 ) -> str:
     """
     Get list of referring domains for target domain via Ahrefs.
@@ -123,65 +125,71 @@ def get_ahrefs_refdomains(
     Args:
         target: Target domain (e.g. "example.com")
         limit: Number of results (maximum 1000, default 100)
+        dataset_only: Return only a dataset handle, field names and a preview;
+            query the rows with query_dataset (default False)
 
     Returns:
         JSON string with list of referring domains
     """
     try:
         order_by = "domain_rating:desc"
-        ahrefs = AhrefsAPI()
+        ahrefs = get_async_ahrefs_client()
 
-        result = ahrefs.get_refdomains(target=target, limit=limit, order_by=order_by)
+        result = await ahrefs.get_refdomains(
+            target=target, limit=limit, order_by=order_by
+        )
 
         if result and "error" in result:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": f"API error: {result['error']}",
                     "details": result.get("details", "Check API key and balance"),
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
         if result and "refdomains" in result:
             refdomains = result["refdomains"]
 
-            return json.dumps(
+            return to_json(
                 {
                     "status": "success",
                     "target": target,
-                    "refdomains": refdomains,
+                    **dataset_fields(
+                        refdomains,
+                        f"get_ahrefs_refdomains:{target}",
+                        "refdomains",
+                        dataset_only,
+                    ),
                     "limit": limit,
                     "order_by": order_by,
                 },
                 indent=2,
-                ensure_ascii=False,
             )
         else:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": "Failed to get referring domains data",
                     "raw_result": str(result)[:500] if result else "None",
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {
                 "status": "error",
                 "message": f"Error getting referring domains: {str(e)}",
             },
             indent=2,
-            ensure_ascii=False,
         )
 
 
-def get_ahrefs_backlinks(
-    target: str, limit: int = 100
+@tool_call
+async def get_ahrefs_backlinks(
+    target: str, limit: int = 100, dataset_only: bool = False
 ) -> str:
     """
     Get list of backlinks for target domain via Ahrefs.
@@ -189,66 +197,73 @@ def get_ahrefs_backlinks(
     Args:
         target: Target domain (e.g. "example.com")
         limit: Number of results (maximum 1000, default 100)
+        dataset_only: Return only a dataset handle, field names and a preview;
+            query the rows with query_dataset (default False)
 
     Returns:
         JSON string with list of backlinks
     """
     try:
         order_by = "domain_rating_source:desc"
-        ahrefs = AhrefsAPI()
-        result = ahrefs.get_backlinks(target=target, limit=limit, order_by=order_by)
+        ahrefs = get_async_ahrefs_client()
+        result = await ahrefs.get_backlinks(
+            target=target, limit=limit, order_by=order_by
+        )
 
         if result and "error" in result:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": f"API error: {result['error']}",
                     "details": result.get("details", "Check API key and balance"),
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
         if result and "backlinks" in result:
             backlinks = result["backlinks"]
 
-            return json.dumps(
+            return to_json(
                 {
                     "status": "success",
                     "target": target,
-                    "backlinks": backlinks,
+                    **dataset_fields(
+                        backlinks,
+                        f"get_ahrefs_backlinks:{target}",
+                        "backlinks",
+                        dataset_only,
+                    ),
                     "limit": limit,
                     "order_by": order_by,
                 },
                 indent=2,
-                ensure_ascii=False,
             )
         else:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": "Failed to get backlinks data",
                     "raw_result": str(result)[:500] if result else "None",
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {
                 "status": "error",
                 "message": f"Error getting backlinks: {str(e)}",
             },
             indent=2,
-            ensure_ascii=False,
         )
 
 
-def get_ahrefs_organic_keywords(
+@tool_call
+async def get_ahrefs_organic_keywords(
     target: str,
     limit: int = 100,
     date: Optional[str] = None,
+    dataset_only: bool = False,
 ) -> str:
     """
     Get organic keywords for target domain via Ahrefs.
@@ -257,60 +272,277 @@ def get_ahrefs_organic_keywords(
         target: Target domain (e.g. "example.com")
         limit: Number of results (maximum 1000, default 100)
         date: Date in YYYY-MM-DD format (default - current date)
+        dataset_only: Return only a dataset handle, field names and a preview;
+            query the rows with query_dataset (default False)
 
     Returns:
         JSON string with list of organic keywords
     """
     try:
-        ahrefs = AhrefsAPI()
+        ahrefs = get_async_ahrefs_client()
         order_by = "best_position:asc"
-        result = ahrefs.get_organic_keywords(
+        result = await ahrefs.get_organic_keywords(
             target=target, limit=limit, order_by=order_by, date=date
         )
 
         if result and "error" in result:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": f"API error: {result['error']}",
                     "details": result.get("details", "Check API key and balance"),
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
         if result and "keywords" in result:
             keywords = result["keywords"]
 
-            return json.dumps(
+            return to_json(
                 {
                     "status": "success",
                     "target": target,
-                    "keywords": keywords,
+                    **dataset_fields(
+                        keywords,
+                        f"get_ahrefs_organic_keywords:{target}",
+                        "keywords",
+                        dataset_only,
+                    ),
                     "limit": limit,
                     "order_by": order_by,
                     "date": date,
                 },
                 indent=2,
-                ensure_ascii=False,
             )
         else:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": "Failed to get organic keywords data",
                     "raw_result": str(result)[:500] if result else "None",
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
+            {
+                "status": "error",
+                "message": f"Error getting organic keywords: {str(e)}",
+            },
+            indent=2,
+        )
+
+
+async def _run_bulk(targets, fetch, max_concurrency):
+    """Run fetch(target) for unique targets concurrently under a concurrency limit"""
+    targets = list(dict.fromkeys(targets))
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(target):
+        async with semaphore:
+            try:
+                return await fetch(target)
+            except Exception as e:
+                return {"error": f"Unexpected error: {str(e)}"}
+
+    results = await asyncio.gather(*(run(target) for target in targets))
+    return dict(zip(targets, results))
+
+
+def _bulk_response(results, data_key, source, dataset_only=False, **extra):
+    """
+    Build per-target results and errors of a bulk request.
+
+    Rows of all targets are registered as one dataset, every row gets
+    a "target" field.
+    """
+    targets = {}
+    rows = []
+    for target, result in results.items():
+        if result and data_key in result:
+            rows.extend({"target": target, **row} for row in result[data_key])
+            targets[target] = {
+                "status": "success",
+                "total_count": len(result[data_key]),
+            }
+        elif result and "error" in result:
+            targets[target] = {
+                "status": "error",
+                "message": f"API error: {result['error']}",
+                "details": result.get("details", "Check API key and balance"),
+            }
+        else:
+            targets[target] = {
+                "status": "error",
+                "message": f"Failed to get {data_key} data",
+                "raw_result": str(result)[:500] if result else "None",
+            }
+
+    failed = sum(1 for target in targets.values() if target["status"] == "error")
+    return to_json(
+        {
+            "status": "success" if failed < len(targets) else "error",
+            "targets": targets,
+            "succeeded": len(targets) - failed,
+            "failed": failed,
+            **dataset_fields(
+                rows, f"{source}:{','.join(results)}", data_key, dataset_only
+            ),
+            **extra,
+        },
+        indent=2,
+    )
+
+
+@tool_call
+async def get_ahrefs_refdomains_bulk(
+    targets: list[str],
+    limit: int = 100,
+    max_concurrency: int = BULK_CONCURRENCY,
+    dataset_only: bool = False,
+) -> str:
+    """
+    Get referring domains for several target domains at once via Ahrefs.
+
+    Args:
+        targets: Target domains (e.g. ["example.com", "competitor.com"])
+        limit: Number of results per target (maximum 1000, default 100)
+        max_concurrency: Max concurrent Ahrefs requests (default 5)
+        dataset_only: Return only a dataset handle, field names and a preview of
+            the rows of all targets; query them with query_dataset (default False)
+
+    Returns:
+        JSON string with status of every target and referring domains of all targets
+        (one dataset, "target" field in every row)
+    """
+    try:
+        order_by = "domain_rating:desc"
+        ahrefs = get_async_ahrefs_client()
+        results = await _run_bulk(
+            targets,
+            lambda target: ahrefs.get_refdomains(
+                target=target, limit=limit, order_by=order_by
+            ),
+            max_concurrency,
+        )
+        return _bulk_response(
+            results,
+            "refdomains",
+            "get_ahrefs_refdomains_bulk",
+            dataset_only,
+            limit=limit,
+            order_by=order_by,
+        )
+
+    except Exception as e:
+        return to_json(
+            {
+                "status": "error",
+                "message": f"Error getting referring domains: {str(e)}",
+            },
+            indent=2,
+        )
+
+
+@tool_call
+async def get_ahrefs_backlinks_bulk(
+    targets: list[str],
+    limit: int = 100,
+    max_concurrency: int = BULK_CONCURRENCY,
+    dataset_only: bool = False,
+) -> str:
+    """
+    Get backlinks for several target domains at once via Ahrefs.
+
+    Args:
+        targets: Target domains (e.g. ["example.com", "competitor.com"])
+        limit: Number of results per target (maximum 1000, default 100)
+        max_concurrency: Max concurrent Ahrefs requests (default 5)
+        dataset_only: Return only a dataset handle, field names and a preview of
+            the rows of all targets; query them with query_dataset (default False)
+
+    Returns:
+        JSON string with status of every target and backlinks of all targets
+        (one dataset, "target" field in every row)
+    """
+    try:
+        order_by = "domain_rating_source:desc"
+        ahrefs = get_async_ahrefs_client()
+        results = await _run_bulk(
+            targets,
+            lambda target: ahrefs.get_backlinks(
+                target=target, limit=limit, order_by=order_by
+            ),
+            max_concurrency,
+        )
+        return _bulk_response(
+            results,
+            "backlinks",
+            "get_ahrefs_backlinks_bulk",
+            dataset_only,
+            limit=limit,
+            order_by=order_by,
+        )
+
+    except Exception as e:
+        return to_json(
+            {
+                "status": "error",
+                "message": f"Error getting backlinks: {str(e)}",
+            },
+            indent=2,
+        )
+
+
+@tool_call
+async def get_ahrefs_organic_keywords_bulk(
+    targets: list[str],
+    limit: int = 100,
+    date: Optional[str] = None,
+    max_concurrency: int = BULK_CONCURRENCY,
+    dataset_only: bool = False,
+) -> str:
+    """
+    Get organic keywords for several target domains at once via Ahrefs.
+
+    Args:
+        targets: Target domains (e.g. ["example.com", "competitor.com"])
+        limit: Number of results per target (maximum 1000, default 100)
+        date: Date in YYYY-MM-DD format (default - current date)
+        max_concurrency: Max concurrent Ahrefs requests (default 5)
+        dataset_only: Return only a dataset handle, field names and a preview of
+            the rows of all targets; query them with query_dataset (default False)
+
+    Returns:
+        JSON string with status of every target and organic keywords of all targets
+        (one dataset, "target" field in every row)
+    """
+    try:
+        order_by = "best_position:asc"
+        ahrefs = get_async_ahrefs_client()
+        results = await _run_bulk(
+            targets,
+            lambda target: ahrefs.get_organic_keywords(
+                target=target, limit=limit, order_by=order_by, date=date
+            ),
+            max_concurrency,
+        )
+        return _bulk_response(
+            results,
+            "keywords",
+            "get_ahrefs_organic_keywords_bulk",
+            dataset_only,
+            limit=limit,
+            order_by=order_by,
+            date=date,
+        )
+
+    except Exception as e:
+        return to_json(
             {
                 "status": "error",
                 "message": f"Error getting organic keywords: {str(e)}",
             },
             indent=2,
-            ensure_ascii=False,
         )
@@ -0,0 +1,66 @@
+from typing import Optional
+from logic.datasets import DatasetError, datasets, field_names, query_rows
+
+from tools.utils import to_json, tool_call
+
+
+@tool_call
+async def query_dataset(
+    dataset_handle: str,
+    filters: Optional[list[dict]] = None,
+    fields: Optional[list[str]] = None,
+    sort: Optional[list[str]] = None,
+    group_by: Optional[list[str]] = None,
+    aggregates: Optional[list[str]] = None,
+    limit: int = 50,
+) -> str:
+    """
+    Filter, sort, group and aggregate a dataset fetched earlier by another tool.
+
+    Tools returning large lists (backlinks, referring domains, organic keywords,
+    position history) include a dataset_handle; query it instead of reading all rows.
+
+    Args:
+        dataset_handle: Handle returned by the tool that fetched the data
+        filters: Conditions joined with AND, e.g. [{"field": "domain_rating", "op": "gte", "value": 50}].
+            op: eq, ne, gt, gte, lt, lte, in (value is a list), contains (case-insensitive substring)
+        fields: Fields to return for every row (default - all)
+        sort: Fields to sort by, "-field" for descending, e.g. ["-domain_rating"]
+        group_by: Fields to group rows by
+        aggregates: Values per group (or for all matched rows): "count" or
+            "count_distinct:<field>", "sum:<field>", "avg:<field>", "min:<field>", "max:<field>"
+        limit: Max number of returned rows/groups (default 50)
+
+    Returns:
+        JSON string with matched row count and resulting rows
+    """
+    try:
+        source, rows = datasets.get(dataset_handle)
+    except DatasetError as e:
+        return to_json({"status": "error", "message": str(e)})
+
+    try:
+        result = query_rows(rows, filters, fields, sort, group_by, aggregates, limit)
+
+        return to_json(
+            {
+                "status": "success",
+                "dataset_handle": dataset_handle,
+                "source": source,
+                "dataset_rows": len(rows),
+                **result,
+            },
+        )
+    except DatasetError as e:
+        # Field names help to fix the query
+        return to_json(
+            {
+                "status": "error",
+                "message": str(e),
+                "dataset_fields": field_names(rows),
+            },
+        )
+    except Exception as e:
+        return to_json(
+            {"status": "error", "message": f"Error querying dataset: {str(e)}"},
+        )
@@ -1,12 +1,30 @@
-import json
+import asyncio
+import logging
 import os
+import sys
+import time
+from datetime import datetime, timedelta
 from typing import Optional
-from logic.topvisor import TopvisorAPI
+from logic.clients import get_async_topvisor_client
+from logic.warehouse import PositionsWarehouse, get_warehouse
 from dotenv import load_dotenv
 
+from tools.utils import dataset_fields, to_json, tool_call
+
 load_dotenv()
 
-def check_topvisor_setup() -> str:
+logger = logging.getLogger(__name__)
+
+# Add diagnostics to every positions history response (debug param per call)
+POSITIONS_DEBUG = os.getenv("TOPVISOR_POSITIONS_DEBUG", "0") == "1"
+# Store fetched projects, keywords and positions in the local warehouse
+WAREHOUSE_FEED = os.getenv("SEO_WAREHOUSE_FEED", "0") == "1"
+
+# Running warehouse feeds, referenced until done so they are not collected
+_feed_tasks = set()
+
+@tool_call
+async def check_topvisor_setup() -> str:
     """
     Check Topvisor API setup and connection.
 
@@ -19,7 +37,7 @@ def check_topvisor_setup() -> str:
         api_key = os.getenv("TOPVISOR_API_KEY")
 
         if not api_key:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": "API key not found",
@@ -31,16 +49,15 @@ def check_topvisor_setup() -> str:
                     "help": "Create .env file and add TOPVISOR_API_KEY=your_key",
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
         # Check API connection
         try:
-            topvisor = TopvisorAPI()
-            result = topvisor.get_balance_info()
+            topvisor = get_async_topvisor_client()
+            result = await topvisor.get_balance_info()
 
             if result and "error" in result:
-                return json.dumps(
+                return to_json(
                     {
                         "status": "warning",
                         "message": f'API key found, but there is a problem: {result["error"]}',
@@ -52,7 +69,6 @@ def check_topvisor_setup() -> str:
                         "help": "Check API key validity and account balance",
                     },
                     indent=2,
-                    ensure_ascii=False,
                 )
             elif result and "result" in result:
                 # Check data type in result["result"]
@@ -71,7 +87,7 @@ def check_topvisor_setup() -> str:
                     # Additional check for objects with get method
                     balance = result_data.get("balance", "N/A")
 
-                return json.dumps(
+                return to_json(
                     {
                         "status": "success",
                         "message": f"Everything is set up correctly! Balance: {balance}",
@@ -89,10 +105,9 @@ def check_topvisor_setup() -> str:
                         ),
                     },
                     indent=2,
-                    ensure_ascii=False,
                 )
             else:
-                return json.dumps(
+                return to_json(
                     {
                         "status": "error",
                         "message": "Unexpected response from API",
@@ -103,7 +118,6 @@ def check_topvisor_setup() -> str:
                         },
                     },
                     indent=2,
-                    ensure_ascii=False,
                 )
 
         except Exception as api_error:
@@ -118,7 +132,7 @@ def check_topvisor_setup() -> str:
                 error_details["likely_cause"] = "Unexpected data format from API"
                 error_details["suggestion"] = "API returned data in unexpected format"
 
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": f"API connection error: {str(api_error)}",
@@ -131,22 +145,21 @@ def check_topvisor_setup() -> str:
                     "help": "Check internet connection and API key validity",
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {
                 "status": "error",
                 "message": f"Setup check error: {str(e)}",
                 "help": "See TOPVISOR_SETUP.md file for instructions",
             },
             indent=2,
-            ensure_ascii=False,
         )
 
 
-def get_topvisor_projects() -> str:
+@tool_call
+async def get_topvisor_projects() -> str:
     """
     Get a list of all user projects in Topvisor.
 
@@ -154,13 +167,13 @@ def get_topvisor_projects() -> str:
         JSON string with a list of projects and their basic information
     """
     try:
-        topvisor = TopvisorAPI()
-        result = topvisor.get_projects()
+        topvisor = get_async_topvisor_client()
+        result = await topvisor.get_projects()
         
 
         # Check for API errors
         if result and "error" in result:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": f"API error: {result['error']}",
@@ -169,7 +182,6 @@ def get_topvisor_projects() -> str:
                     ),
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
         if result and "result" in result:
@@ -186,39 +198,39 @@ def get_topvisor_projects() -> str:
                 }
                 project_info.append(info)
 
-            return json.dumps(
+            _feed_warehouse(PositionsWarehouse.store_projects, project_info)
+
+            return to_json(
                 {
                     "status": "success",
                     "projects": project_info,
                     "total_count": len(project_info),
                 },
                 indent=2,
-                ensure_ascii=False,
             )
         else:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": "Failed to get project data",
                     "help": "Check TOPVISOR_SETUP.md file for API key setup",
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {
                 "status": "error",
                 "message": f"Error getting projects: {str(e)}",
                 "help": "Create .env file with TOPVISOR_API_KEY. See TOPVISOR_SETUP.md",
             },
             indent=2,
-            ensure_ascii=False,
         )
 
 
-def get_topvisor_keywords(
+@tool_call
+async def get_topvisor_keywords(
     project_id: int,
     folder_id: Optional[int] = None,
     group_id: Optional[int] = None,
@@ -235,18 +247,19 @@ def get_topvisor_keywords(
         JSON string with project keywords
     """
     try:
-        topvisor = TopvisorAPI()
-        result = topvisor.get_project_keywords(project_id, folder_id, group_id)
+        topvisor = get_async_topvisor_client()
+        result = await topvisor.get_project_keywords(
+            project_id, folder_id, group_id
+        )
 
         if "errors" in result and result["errors"]:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "project_id": project_id,
                     "message": result["errors"],
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
         if result and "result" in result:
@@ -264,7 +277,11 @@ def get_topvisor_keywords(
                 }
                 keywords_info.append(info)
 
-            return json.dumps(
+            _feed_warehouse(
+                PositionsWarehouse.store_keywords, project_id, keywords_info
+            )
+
+            return to_json(
                 {
                     "status": "success",
                     "project_id": project_id,
@@ -272,113 +289,473 @@ def get_topvisor_keywords(
                     "total_count": len(keywords_info),
                 },
                 indent=2,
-                ensure_ascii=False,
             )
         else:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": "Failed to get keyword data",
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {
                 "status": "error",
                 "message": f"Error getting keywords: {str(e)}",
             },
             indent=2,
-            ensure_ascii=False,
         )
 
 
-def get_topvisor_positions_history(
+async def _fetch_positions(
+    topvisor,
+    project_id,
+    regions_indexes,
+    date1,
+    date2,
+    limit,
+    offset,
+    fetch_all,
+    max_concurrency,
+    limiter=None,
+):
+    """
+    Get one page or (with fetch_all) all pages of position history.
+
+    All page and date shard requests share limiter, at most max_concurrency
+    requests are in flight unless a shared limiter is given.
+    """
+    if limiter is None:
+        limiter = asyncio.Semaphore(max(1, max_concurrency))
+    if fetch_all:
+        return await topvisor.get_all_project_positions(
+            project_id,
+            regions_indexes,
+            date1,
+            date2,
+            max_concurrency=max_concurrency,
+            limiter=limiter,
+        )
+    return await topvisor.get_project_positions(
+        project_id, regions_indexes, date1, date2, limit, offset, limiter=limiter
+    )
+
+
+# Marker of date keys not parsed yet, None is cached for malformed ones
+_UNPARSED = object()
+
+
+def _parse_date_key(date_key, date_keys):
+    """
+    Split "2025-08-15:19294818:33" into interned (date, project_id, region).
+
+    Keys repeat for every keyword, so they are parsed once per response and
+    kept in date_keys.
+    """
+    parsed = date_keys.get(date_key, _UNPARSED)
+    if parsed is _UNPARSED:
+        parts = date_key.split(":")
+        parsed = tuple(map(sys.intern, parts[:3])) if len(parts) >= 3 else None
+        date_keys[date_key] = parsed
+    return parsed
+
+
+def _date_range(dates):
+    return {
+        "start": min(dates, default="no_data"),
+        "end": max(dates, default="no_data"),
+    }
+
+
+def _flatten_positions(keywords):
+    """
+    Flatten keywords positionsData into one row per keyword, date and region.
+
+    Single pass: date keys and position values are parsed once per response
+    and stats are collected along the way.
+
+    Returns:
+        (rows, stats with total_count, unique_keywords and date_range)
+    """
+    positions_info = []
+    append = positions_info.append
+    date_keys = {}
+    dates = set()
+    # position -> (position_numeric, is_not_ranking)
+    position_values = {}
+    keyword_names = set()
+
+    for keyword_data in keywords:
+        if not isinstance(keyword_data, dict):
+            continue
+        keyword_name = keyword_data.get("name", "unknown")
+        rows_before = len(positions_info)
+
+        for date_key, position_info in keyword_data.get("positionsData", {}).items():
+            if not (isinstance(position_info, dict) and "position" in position_info):
+                continue
+            parsed = _parse_date_key(date_key, date_keys)
+            if parsed is None:
+                continue
+            date, project_id_from_key, region_from_key = parsed
+            dates.add(date)
+
+            position_value = position_info["position"]
+            flags = position_values.get(position_value)
+            if flags is None:
+                flags = position_values[position_value] = (
+                    int(position_value) if position_value.isdigit() else None,
+                    position_value == "--",  # Flag for positions outside top
+                )
+
+            append(
+                {
+                    "keyword_name": keyword_name,
+                    "date": date,
+                    "position": position_value,
+                    "project_id": project_id_from_key,
+                    "region": region_from_key,
+                    "position_numeric": flags[0],
+                    "is_not_ranking": flags[1],
+                }
+            )
+
+        if len(positions_info) > rows_before:
+            keyword_names.add(keyword_name)
+
+    return positions_info, {
+        "total_count": len(positions_info),
+        "unique_keywords": len(keyword_names),
+        "date_range": _date_range(dates),
+    }
+
+
+def _positions_matrix(keywords):
+    """
+    Columnar form of keywords positionsData: keywords and dates are listed
+    once, positions of every region are a keyword x date matrix where
+    not ranking ("--") and missing positions are null.
+    """
+    names = []
+    cells = []  # (keyword row, date, region, position)
+    date_keys = {}
+    for keyword_data in keywords:
+        if not isinstance(keyword_data, dict):
+            continue
+        row = len(names)
+        names.append(keyword_data.get("name", "unknown"))
+        for date_key, position_info in keyword_data.get("positionsData", {}).items():
+            if isinstance(position_info, dict) and "position" in position_info:
+                parsed = _parse_date_key(date_key, date_keys)
+                if parsed is not None:
+                    cells.append((row, parsed[0], parsed[2], position_info["position"]))
+
+    dates = sorted({parsed[0] for parsed in date_keys.values() if parsed})
+    date_columns = {date: column for column, date in enumerate(dates)}
+    regions = {}
+    for row, date, region, position_value in cells:
+        matrix = regions.get(region)
+        if matrix is None:
+            matrix = regions[region] = [[None] * len(dates) for _ in names]
+        if position_value.isdigit():
+            position_value = int(position_value)
+        elif position_value == "--":
+            position_value = None
+        matrix[row][date_columns[date]] = position_value
+
+    return {
+        "positions_matrix": {"keywords": names, "dates": dates, "regions": regions},
+        "total_count": len(cells),
+        "unique_keywords": len(set(names)),
+        "date_range": _date_range(dates),
+    }
+
+
+def _format_positions(keywords, output_format):
+    """Positions fields of a response in rows or matrix output format"""
+    if output_format == "matrix":
+        return _positions_matrix(keywords)
+    positions_info, stats = _flatten_positions(keywords)
+    return {"positions": positions_info, **stats}
+
+
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _positions_debug_info(result, sent_params):
+    """Safe debug information (without full API response)"""
+    return {
+        "sent_params": sent_params,
+        "api_response_type": type(result).__name__,
+        "api_response_keys": (
+            list(result.keys()) if isinstance(result, dict) else "not_dict"
+        ),
+        # Safe API response version - structure only, no data
+        "api_response_summary": {
+            "has_result_key": (
+                "result" in result if isinstance(result, dict) else False
+            ),
+            "has_error_key": "error" in result if isinstance(result, dict) else False,
+            "result_type": (
+                type(result.get("result")).__name__
+                if isinstance(result, dict) and "result" in result
+                else "no_result"
+            ),
+            "result_length": (
+                len(result.get("result"))
+                if isinstance(result, dict)
+                and "result" in result
+                and hasattr(result.get("result"), "__len__")
+                else "no_length"
+            ),
+        },
+    }
+
+
+def _pages_fields(result):
+    """Page count of a positions response plus truncation marks of fetch_all"""
+    fields = {"pages": result.get("pages", 1)}
+    if result.get("truncated"):
+        fields["truncated"] = True
+        fields["next_offset"] = result["next_offset"]
+    return fields
+
+
+def _with_debug(response, debug_info):
+    if debug_info is None:
+        return response
+    return {**response, "debug": debug_info}
+
+
+async def _positions_history_by_region(
+    topvisor,
+    project_id,
+    regions_indexes,
+    date1,
+    date2,
+    limit,
+    offset,
+    fetch_all,
+    max_concurrency,
+    output_format,
+    dataset_only,
+):
+    """
+    Request history of every region separately and group results by region.
+
+    With rows output, rows of all regions are registered as one dataset.
+    """
+    # Requests of all regions, pages and date shards share the concurrency cap;
+    # regions keep it busy, so pages of one region go one by one
+    limiter = asyncio.Semaphore(max(1, max_concurrency))
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            _fetch_positions(
+                topvisor,
+                project_id,
+                [region_index],
+                date1,
+                date2,
+                limit,
+                offset,
+                fetch_all,
+                1,
+                limiter,
+            )
+            for region_index in regions_indexes
+        )
+    )
+    timing = {"upstream_ms": _elapsed_ms(started)}
+
+    started = time.perf_counter()
+    regions = {}
+    keyword_lists = []
+    rows = []
+    for region_index, result in zip(regions_indexes, results):
+        result_data = result.get("result") if isinstance(result, dict) else None
+        if isinstance(result_data, dict) and "keywords" in result_data:
+            keyword_lists.append(result_data["keywords"])
+            positions = _format_positions(result_data["keywords"], output_format)
+            if output_format == "rows":
+                rows.extend(positions.pop("positions"))
+            regions[str(region_index)] = {
+                "status": "success",
+                **positions,
+                **_pages_fields(result),
+            }
+        else:
+            message = "Failed to get position data"
+            if isinstance(result, dict):
+                message = result.get("errors") or result.get("error") or message
+            regions[str(region_index)] = {"status": "error", "message": message}
+
+    timing["parse_ms"] = _elapsed_ms(started)
+
+    _feed_warehouse(_store_positions, project_id, keyword_lists)
+
+    dataset = {}
+    if output_format == "rows":
+        dataset = dataset_fields(
+            rows,
+            f"get_topvisor_positions_history:{project_id}",
+            "positions",
+            dataset_only,
+        )
+
+    failed = sum(1 for region in regions.values() if region["status"] == "error")
+    return to_json(
+        {
+            "status": "success" if failed < len(regions) else "error",
+            "project_id": project_id,
+            "regions_indexes": [str(region_index) for region_index in regions_indexes],
+            "period": f"{date1 or 'auto'} - {date2 or 'auto'}",
+            "regions": regions,
+            "failed_regions": failed,
+            **dataset,
+            "limit": limit,
+            "offset": offset,
+            "fetch_all": fetch_all,
+            "output_format": output_format,
+        },
+        timing=timing,
+    )
+
+
+@tool_call
+async def get_topvisor_positions_history(
     project_id: int,
     regions_indexes=["33"],
     date1: Optional[str] = None,
     date2: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
+    fetch_all: bool = False,
+    max_concurrency: int = 4,
+    fan_out: bool = False,
+    output_format: str = "rows",
+    debug: bool = False,
+    dataset_only: bool = False,
 ) -> str:
     """
     Get keyword position history for a project in Topvisor.
 
     Args:
         project_id: Project ID in Topvisor
-        regions_indexes: Region indexes. For project 23059018 regions_indexes equals ["42"]
+        regions_indexes: Region indexes. For project 23059018 regions_indexes equals ["42"].
+            "all" - all regions of the project
         date1: Period start date in YYYY-MM-DD format (default 7 days ago)
         date2: Period end date in YYYY-MM-DD format (default today)
-        limit: Number of records (default 100 for speed)
-        offset: Pagination offset (default 0)
+        limit: Number of records (default 100 for speed), ignored when fetch_all is set
+        offset: Pagination offset (default 0), ignored when fetch_all is set
+        fetch_all: Fetch all pages server-side and return them merged (default False).
+            If the page cap is reached, the result has truncated and next_offset
+        max_concurrency: Max concurrent requests of pages, date shards and regions together (default 4)
+        fan_out: Request every region separately and group results by region, rows
+            output returns rows of all regions in one list (default False)
+        output_format: "rows" - one record per keyword, date and region (default),
+            "matrix" - keywords and dates listed once with a keyword x date positions
+            matrix per region (null - not ranking), much smaller for long periods
+        debug: Add request/response diagnostics to the result (default False)
+        dataset_only: With rows output return only a dataset handle, field names and
+            a preview; query the rows with query_dataset (default False)
 
     Returns:
-        JSON string with position history
+        JSON string with position history and timing (upstream_ms, parse_ms,
+        serialize_ms, bytes)
     """
     try:
-        topvisor = TopvisorAPI()
-        result = topvisor.get_project_positions(
-            project_id, regions_indexes, date1, date2, limit, offset
+        if output_format not in ("rows", "matrix"):
+            return to_json(
+                {
+                    "status": "error",
+                    "message": f"Unknown output_format: {output_format}, expected rows or matrix",
+                },
+            )
+
+        topvisor = get_async_topvisor_client()
+        if fetch_all:
+            offset = 0
+
+        if regions_indexes == "all":
+            region_indexes = await topvisor.get_project_region_indexes(project_id)
+            if not region_indexes.get("result"):
+                return to_json(
+                    {
+                        "status": "error",
+                        "message": "Failed to get project regions",
+                        "details": region_indexes.get("errors")
+                        or region_indexes.get("error"),
+                    },
+                )
+            regions_indexes = region_indexes["result"]
+
+        if fan_out:
+            return await _positions_history_by_region(
+                topvisor,
+                project_id,
+                regions_indexes,
+                date1,
+                date2,
+                limit,
+                offset,
+                fetch_all,
+                max_concurrency,
+                output_format,
+                dataset_only,
+            )
+
+        started = time.perf_counter()
+        result = await _fetch_positions(
+            topvisor,
+            project_id,
+            regions_indexes,
+            date1,
+            date2,
+            limit,
+            offset,
+            fetch_all,
+            max_concurrency,
         )
+        timing = {"upstream_ms": _elapsed_ms(started)}
 
-        # Safe debug information (without full API response)
-        debug_info = {
-            "sent_params": {
-                "project_id": project_id,
-                "regions_indexes": regions_indexes,
-                "date1": date1,
-                "date2": date2,
-                "limit": limit,
-                "offset": offset,
-            },
-            "api_response_type": type(result).__name__,
-            "api_response_keys": (
-                list(result.keys()) if isinstance(result, dict) else "not_dict"
-            ),
-            # Safe API response version - structure only, no data
-            "api_response_summary": {
-                "has_result_key": (
-                    "result" in result if isinstance(result, dict) else False
-                ),
-                "has_error_key": (
-                    "error" in result if isinstance(result, dict) else False
-                ),
-                "result_type": (
-                    type(result.get("result")).__name__
-                    if isinstance(result, dict) and "result" in result
-                    else "no_result"
-                ),
-                "result_length": (
-                    len(result.get("result"))
-                    if isinstance(result, dict)
-                    and "result" in result
-                    and hasattr(result.get("result"), "__len__")
-                    else "no_length"
-                ),
-            },
-        }
+        # Diagnostics cost time and tokens on every call, so they are opt-in
+        debug_info = None
+        if debug or POSITIONS_DEBUG:
+            debug_info = _positions_debug_info(
+                result,
+                {
+                    "project_id": project_id,
+                    "regions_indexes": regions_indexes,
+                    "date1": date1,
+                    "date2": date2,
+                    "limit": limit,
+                    "offset": offset,
+                    "fetch_all": fetch_all,
+                },
+            )
 
         # Quick check for API errors
         if not result:
-            return json.dumps(
-                {
-                    "status": "error",
-                    "message": "Empty response from API",
-                    "debug": debug_info,
-                },
-                ensure_ascii=False,
+            return to_json(
+                _with_debug(
+                    {"status": "error", "message": "Empty response from API"},
+                    debug_info,
+                ),
+                timing=timing,
             )
 
         if isinstance(result, dict) and "errors" in result and result["errors"]:
-            return json.dumps(
-                {
-                    "status": "error",
-                    "message": f"API error: {result['errors']}",
-                    "debug": debug_info,
-                },
-                ensure_ascii=False,
+            return to_json(
+                _with_debug(
+                    {"status": "error", "message": f"API error: {result['errors']}"},
+                    debug_info,
+                ),
+                timing=timing,
             )
 
         if isinstance(result, dict) and "result" in result:
@@ -386,132 +763,102 @@ def get_topvisor_positions_history(
 
             # Check that result_data is not None
             if result_data is None:
-                return json.dumps(
-                    {
-                        "status": "error",
-                        "message": "API returned result=None (no position data for specified period)",
-                        "debug": {
-                            **debug_info,
-                            "positions_details": {
-                                "result_data_type": "NoneType",
-                                "result_data_value": None,
-                                "reason": "API returned result=None, likely no position data for specified period",
-                            },
+                if debug_info is not None:
+                    debug_info["positions_details"] = {
+                        "result_data_type": "NoneType",
+                        "result_data_value": None,
+                        "reason": "API returned result=None, likely no position data for specified period",
+                    }
+                return to_json(
+                    _with_debug(
+                        {
+                            "status": "error",
+                            "message": "API returned result=None (no position data for specified period)",
                         },
-                    },
-                    ensure_ascii=False,
+                        debug_info,
+                    ),
+                    timing=timing,
                 )
 
-            positions_info = []
-
-            # Update debug information for new structure
-            debug_info["positions_details"] = {
-                "result_data_type": type(result_data).__name__,
-                "result_data_keys": (
-                    list(result_data.keys())
-                    if isinstance(result_data, dict)
-                    else "not_dict"
-                ),
-                "has_keywords_key": (
-                    "keywords" in result_data
-                    if isinstance(result_data, dict)
-                    else False
-                ),
-            }
-
-            # Process new data structure
+            keywords = []
             if isinstance(result_data, dict) and "keywords" in result_data:
                 keywords = result_data["keywords"]
-                debug_info["positions_details"]["keywords_count"] = (
-                    len(keywords) if hasattr(keywords, "__len__") else "no_length"
-                )
 
-                for keyword_data in keywords:
-                    if isinstance(keyword_data, dict):
-                        keyword_name = keyword_data.get("name", "unknown")
-                        positions_data = keyword_data.get("positionsData", {})
-
-                        # Process each date in positionsData
-                        for date_key, position_info in positions_data.items():
-                            if (
-                                isinstance(position_info, dict)
-                                and "position" in position_info
-                            ):
-                                # Parse date key (format: "2025-08-15:19294818:33")
-                                parts = date_key.split(":")
-                                if len(parts) >= 3:
-                                    date = parts[0]
-                                    project_id_from_key = parts[1]
-                                    region_from_key = parts[2]
-
-                                    position_value = position_info["position"]
-
-                                    positions_info.append(
-                                        {
-                                            "keyword_name": keyword_name,
-                                            "date": date,
-                                            "position": position_value,
-                                            "project_id": project_id_from_key,
-                                            "region": region_from_key,
-                                            "position_numeric": (
-                                                int(position_value)
-                                                if position_value.isdigit()
-                                                else None
-                                            ),
-                                            "is_not_ranking": position_value
-                                            == "--",  # Flag for positions outside top
-                                        }
-                                    )
-
-            return json.dumps(
-                {
-                    "status": "success",
-                    "project_id": project_id,
-                    "regions_indexes": regions_indexes,
-                    "period": f"{date1 or 'auto'} - {date2 or 'auto'}",
-                    "positions": positions_info,
-                    "total_count": len(positions_info),
-                    "unique_keywords": len(
-                        set(pos["keyword_name"] for pos in positions_info)
+            if debug_info is not None:
+                debug_info["positions_details"] = {
+                    "result_data_type": type(result_data).__name__,
+                    "result_data_keys": (
+                        list(result_data.keys())
+                        if isinstance(result_data, dict)
+                        else "not_dict"
                     ),
-                    "date_range": {
-                        "start": min(
-                            (pos["date"] for pos in positions_info), default="no_data"
-                        ),
-                        "end": max(
-                            (pos["date"] for pos in positions_info), default="no_data"
-                        ),
+                    "has_keywords_key": (
+                        "keywords" in result_data
+                        if isinstance(result_data, dict)
+                        else False
+                    ),
+                }
+                if isinstance(result_data, dict) and "keywords" in result_data:
+                    debug_info["positions_details"]["keywords_count"] = (
+                        len(keywords) if hasattr(keywords, "__len__") else "no_length"
+                    )
+
+            started = time.perf_counter()
+            positions = _format_positions(keywords, output_format)
+            timing["parse_ms"] = _elapsed_ms(started)
+            if output_format == "rows":
+                positions.update(
+                    dataset_fields(
+                        positions.pop("positions"),
+                        f"get_topvisor_positions_history:{project_id}",
+                        "positions",
+                        dataset_only,
+                    )
+                )
+
+            _feed_warehouse(_store_positions, project_id, [keywords])
+
+            return to_json(
+                _with_debug(
+                    {
+                        "status": "success",
+                        "project_id": project_id,
+                        "regions_indexes": regions_indexes,
+                        "period": f"{date1 or 'auto'} - {date2 or 'auto'}",
+                        **positions,
+                        "limit": limit,
+                        "offset": offset,
+                        "fetch_all": fetch_all,
+                        "output_format": output_format,
+                        **_pages_fields(result),
                     },
-                    "limit": limit,
-                    "offset": offset,
-                    "debug": debug_info,
-                },
-                ensure_ascii=False,
+                    debug_info,
+                ),
+                timing=timing,
             )
         else:
-            return json.dumps(
-                {
-                    "status": "error",
-                    "message": "Failed to get position data",
-                    "debug": debug_info,
-                },
-                ensure_ascii=False,
+            return to_json(
+                _with_debug(
+                    {"status": "error", "message": "Failed to get position data"},
+                    debug_info,
+                ),
+                timing=timing,
             )
 
     except Exception as e:
         # More detailed error handling
-        return json.dumps(
+        return to_json(
             {
                 "status": "error",
                 "message": f"Error getting positions: {str(e)}",
                 "error_type": type(e).__name__,
                 "error_details": str(e),
             },
-            ensure_ascii=False,
         )
 
 
-def get_topvisor_positions_summary(
+@tool_call
+async def get_topvisor_positions_summary(
     project_id: int, date1: Optional[str] = None, date2: Optional[str] = None
 ) -> str:
     """
@@ -526,23 +873,22 @@ def get_topvisor_positions_summary(
         JSON string with position summary
     """
     try:
-        topvisor = TopvisorAPI()
-        result = topvisor.get_positions_summary(project_id, date1, date2)
+        topvisor = get_async_topvisor_client()
+        result = await topvisor.get_positions_summary(project_id, date1, date2)
 
         if "errors" in result and result["errors"]:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": result["errors"],
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
         if result and "result" in result:
             summary = result["result"]
 
-            return json.dumps(
+            return to_json(
                 {
                     "status": "success",
                     "project_id": project_id,
@@ -550,27 +896,25 @@ def get_topvisor_positions_summary(
                     "summary": summary,
                 },
                 indent=2,
-                ensure_ascii=False,
             )
         else:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": "Failed to get position summary",
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {"status": "error", "message": f"Error getting summary: {str(e)}"},
             indent=2,
-            ensure_ascii=False,
         )
 
 
-def get_topvisor_competitors(project_id: int) -> str:
+@tool_call
+async def get_topvisor_competitors(project_id: int) -> str:
     """
     Get project competitors list in Topvisor.
 
@@ -581,17 +925,16 @@ def get_topvisor_competitors(project_id: int) -> str:
         JSON string with competitors list
     """
     try:
-        topvisor = TopvisorAPI()
-        result = topvisor.get_project_competitors(project_id)
+        topvisor = get_async_topvisor_client()
+        result = await topvisor.get_project_competitors(project_id)
 
         if "errors" in result and result["errors"]:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": result["errors"],
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
         if result and "result" in result:
@@ -608,7 +951,7 @@ def get_topvisor_competitors(project_id: int) -> str:
                 }
                 competitors_info.append(info)
 
-            return json.dumps(
+            return to_json(
                 {
                     "status": "success",
                     "project_id": project_id,
@@ -616,30 +959,28 @@ def get_topvisor_competitors(project_id: int) -> str:
                     "total_count": len(competitors_info),
                 },
                 indent=2,
-                ensure_ascii=False,
             )
         else:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": "Failed to get competitor data",
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {
                 "status": "error",
                 "message": f"Error getting competitors: {str(e)}",
             },
             indent=2,
-            ensure_ascii=False,
         )
 
 
-def get_topvisor_regions(project_id: int) -> str:
+@tool_call
+async def get_topvisor_regions(project_id: int) -> str:
     """
     Get project regions and search engines in Topvisor.
 
@@ -650,23 +991,22 @@ def get_topvisor_regions(project_id: int) -> str:
         JSON string with regions and search engines
     """
     try:
-        topvisor = TopvisorAPI()
-        result = topvisor.get_project_regions(project_id)
+        topvisor = get_async_topvisor_client()
+        result = await topvisor.get_project_regions(project_id)
 
         if "errors" in result and result["errors"]:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": result["errors"],
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
         if result and "result" in result:
             regions = result["result"]
 
-            return json.dumps(
+            return to_json(
                 {
                     "status": "success",
                     "project_id": project_id,
@@ -674,24 +1014,22 @@ def get_topvisor_regions(project_id: int) -> str:
                     "total_count": len(regions),
                 },
                 indent=2,
-                ensure_ascii=False,
             )
         else:
-            return json.dumps(
+            return to_json(
                 {"status": "error", "message": "Failed to get region data"},
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {"status": "error", "message": f"Error getting regions: {str(e)}"},
             indent=2,
-            ensure_ascii=False,
         )
 
 
-def get_topvisor_keyword_folders(project_id: int) -> str:
+@tool_call
+async def get_topvisor_keyword_folders(project_id: int) -> str:
     """
     Get project keyword folders in Topvisor.
 
@@ -702,17 +1040,16 @@ def get_topvisor_keyword_folders(project_id: int) -> str:
         JSON string with keyword folders
     """
     try:
-        topvisor = TopvisorAPI()
-        result = topvisor.get_keyword_folders(project_id)
+        topvisor = get_async_topvisor_client()
+        result = await topvisor.get_keyword_folders(project_id)
 
         if "errors" in result and result["errors"]:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": result["errors"],
                 },
                 indent=2,
-                ensure_ascii=False,
             )
 
         if result and "result" in result:
@@ -728,7 +1065,7 @@ def get_topvisor_keyword_folders(project_id: int) -> str:
                 }
                 folders_info.append(info)
 
-            return json.dumps(
+            return to_json(
                 {
                     "status": "success",
                     "project_id": project_id,
@@ -736,24 +1073,22 @@ def get_topvisor_keyword_folders(project_id: int) -> str:
                     "total_count": len(folders_info),
                 },
                 indent=2,
-                ensure_ascii=False,
             )
         else:
-            return json.dumps(
+            return to_json(
                 {"status": "error", "message": "Failed to get folder data"},
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {"status": "error", "message": f"Error getting folders: {str(e)}"},
             indent=2,
-            ensure_ascii=False,
         )
 
 
-def get_topvisor_keyword_groups(
+@tool_call
+async def get_topvisor_keyword_groups(
     project_id: int, folder_id: Optional[int] = None
 ) -> str:
     """
@@ -767,17 +1102,16 @@ def get_topvisor_keyword_groups(
         JSON string with keyword groups
     """
     try:
-        topvisor = TopvisorAPI()
-        result = topvisor.get_keyword_groups(project_id, folder_id)
+        topvisor = get_async_topvisor_client()
+        result = await topvisor.get_keyword_groups(project_id, folder_id)
 
         if "errors" in result and result["errors"]:
-            return json.dumps(
+            return to_json(
                 {
                     "status": "error",
                     "message": result["errors"],
                 },
                 indent=2,
-                ensure_ascii=False,
             )
             
 
@@ -795,7 +1129,7 @@ def get_topvisor_keyword_groups(
                 }
                 groups_info.append(info)
 
-            return json.dumps(
+            return to_json(
                 {
                     "status": "success",
                     "project_id": project_id,
@@ -804,24 +1138,22 @@ def get_topvisor_keyword_groups(
                     "total_count": len(groups_info),
                 },
                 indent=2,
-                ensure_ascii=False,
             )
         else:
-            return json.dumps(
+            return to_json(
                 {"status": "error", "message": "Failed to get group data"},
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {"status": "error", "message": f"Error getting groups: {str(e)}"},
             indent=2,
-            ensure_ascii=False,
         )
 
 
-def get_topvisor_balance() -> str:
+@tool_call
+async def get_topvisor_balance() -> str:
     """
     Get account balance information in Topvisor.
 
@@ -829,13 +1161,13 @@ def get_topvisor_balance() -> str:
         JSON string with balance information
     """
     try:
-        topvisor = TopvisorAPI()
-        result = topvisor.get_balance_info()
+        topvisor = get_async_topvisor_client()
+        result = await topvisor.get_balance_info()
 
         if result and "result" in result:
             balance_info = result["result"]
 
-            return json.dumps(
+            return to_json(
                 {
                     "status": "success",
                     "balance": balance_info.get("balance"),
@@ -844,24 +1176,22 @@ def get_topvisor_balance() -> str:
                     "account_info": balance_info,
                 },
                 indent=2,
-                ensure_ascii=False,
             )
         else:
-            return json.dumps(
+            return to_json(
                 {"status": "error", "message": "Failed to get balance data"},
                 indent=2,
-                ensure_ascii=False,
             )
 
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {"status": "error", "message": f"Error getting balance: {str(e)}"},
             indent=2,
-            ensure_ascii=False,
         )
 
 
-def get_topvisor_project_keywords(project_id: int) -> str:
+@tool_call
+async def get_topvisor_project_keywords(project_id: int) -> str:
     """
     Get project keywords for diagnostics.
 
@@ -872,19 +1202,201 @@ def get_topvisor_project_keywords(project_id: int) -> str:
         JSON string with project keywords list
     """
     try:
-        topvisor = TopvisorAPI()
-        result = topvisor.get_project_keywords(project_id)
+        topvisor = get_async_topvisor_client()
+        result = await topvisor.get_project_keywords(project_id)
 
-        return json.dumps(
+        return to_json(
             {"status": "success", "project_id": project_id, "keywords_data": result},
-            ensure_ascii=False,
         )
     except Exception as e:
-        return json.dumps(
+        return to_json(
             {
                 "status": "error",
                 "message": f"Error getting keywords: {str(e)}",
             },
-            ensure_ascii=False,
         )
 
+
+
+def _positions_records(keywords):
+    """(region_index, keyword_id, keyword_name, date, position) from positionsData"""
+    date_keys = {}
+    for keyword_data in keywords:
+        if not isinstance(keyword_data, dict) or "id" not in keyword_data:
+            continue
+        keyword_name = keyword_data.get("name", "unknown")
+        for date_key, position_info in keyword_data.get("positionsData", {}).items():
+            if isinstance(position_info, dict) and "position" in position_info:
+                parsed = _parse_date_key(date_key, date_keys)
+                if parsed is not None:
+                    yield (
+                        parsed[2],
+                        keyword_data["id"],
+                        keyword_name,
+                        parsed[0],
+                        position_info["position"],
+                    )
+
+
+def _store_positions(warehouse, project_id, keyword_lists):
+    """Store positionsData of fetched keyword lists in the warehouse"""
+    records = [
+        record for keywords in keyword_lists for record in _positions_records(keywords)
+    ]
+    return warehouse.store_positions(project_id, records)
+
+
+def _feed_warehouse(method, *args):
+    """
+    Store fetched data in the local warehouse (SEO_WAREHOUSE_FEED).
+
+    method is called as method(warehouse, *args). The warehouse is only opened
+    when the feed is on; it runs in the background after the tool responds and
+    never fails it. The time it took is logged.
+    """
+    if not WAREHOUSE_FEED:
+        return
+    task = asyncio.create_task(_run_feed(method, *args))
+    _feed_tasks.add(task)
+    task.add_done_callback(_feed_tasks.discard)
+
+
+async def _run_feed(method, *args):
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(lambda: method(get_warehouse(), *args))
+    except Exception:
+        logger.warning("Failed to store data in positions warehouse", exc_info=True)
+    else:
+        logger.info(
+            "warehouse feed=%s elapsed_ms=%.1f",
+            method.__name__,
+            (time.perf_counter() - started) * 1000,
+        )
+
+
+async def _sync_region(topvisor, warehouse, project_id, region_index, initial_days):
+    """Fetch dates of one region newer than its last sync and store them"""
+    last_date = await asyncio.to_thread(
+        warehouse.last_synced, project_id, region_index
+    )
+    today = datetime.now()
+    # The last synced day is requested again: it may have been synced before
+    # that day's check finished
+    date1 = last_date or (today - timedelta(days=initial_days)).strftime("%Y-%m-%d")
+    date2 = today.strftime("%Y-%m-%d")
+
+    result = await topvisor.get_all_project_positions(
+        project_id, [region_index], date1, date2, max_concurrency=1
+    )
+    result_data = result.get("result") if isinstance(result, dict) else None
+    if not (isinstance(result_data, dict) and "keywords" in result_data):
+        message = "Failed to get position data"
+        if isinstance(result, dict):
+            message = result.get("errors") or result.get("error") or message
+        return {"status": "error", "message": message, "last_synced": last_date}
+
+    # Stored pages are kept, but a truncated period is not marked as synced,
+    # so the next sync requests it again
+    truncated = bool(result.get("truncated"))
+    stored = await asyncio.to_thread(
+        warehouse.store_positions,
+        project_id,
+        list(_positions_records(result_data["keywords"])),
+        None if truncated else {region_index: date2},
+    )
+    return {
+        "status": "error" if truncated else "success",
+        "previous_sync": last_date,
+        "fetched_period": f"{date1} - {date2}",
+        "positions_stored": stored,
+        **_pages_fields(result),
+        "last_synced": last_date if truncated else date2,
+    }
+
+
+async def _sync_keywords(topvisor, warehouse, project_id):
+    """Store keyword folders and groups, used by warehouse stats filters"""
+    result = await topvisor.get_project_keywords(project_id)
+    keywords = result.get("result") if isinstance(result, dict) else None
+    if not isinstance(keywords, list):
+        message = "Failed to get project keywords"
+        if isinstance(result, dict):
+            message = result.get("errors") or result.get("error") or message
+        return {"status": "error", "message": message}
+
+    await asyncio.to_thread(warehouse.store_keywords, project_id, keywords)
+    return {"status": "success", "keywords_stored": len(keywords)}
+
+
+@tool_call
+async def sync_topvisor_positions(
+    project_id: int,
+    regions_indexes=["33"],
+    initial_days: int = 30,
+    max_concurrency: int = 4,
+) -> str:
+    """
+    Incrementally sync keyword position history of a project into the local store.
+
+    Only dates since the last sync of every region are requested from Topvisor,
+    so regular syncs transfer just the new days. Keyword folders and groups are
+    refreshed on every sync.
+
+    Args:
+        project_id: Project ID in Topvisor
+        regions_indexes: Region indexes, "all" - all regions of the project
+        initial_days: Days of history fetched on the first sync of a region (default 30)
+        max_concurrency: Max regions synced concurrently (default 4)
+
+    Returns:
+        JSON string with sync results per region
+    """
+    try:
+        topvisor = get_async_topvisor_client()
+        warehouse = get_warehouse()
+
+        if regions_indexes == "all":
+            region_indexes = await topvisor.get_project_region_indexes(project_id)
+            if not region_indexes.get("result"):
+                return to_json(
+                    {
+                        "status": "error",
+                        "message": "Failed to get project regions",
+                        "details": region_indexes.get("errors")
+                        or region_indexes.get("error"),
+                    },
+                )
+            regions_indexes = region_indexes["result"]
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def sync_region(region_index):
+            async with semaphore:
+                return await _sync_region(
+                    topvisor, warehouse, project_id, region_index, initial_days
+                )
+
+        keywords, *results = await asyncio.gather(
+            _sync_keywords(topvisor, warehouse, project_id),
+            *(sync_region(region_index) for region_index in regions_indexes),
+        )
+        regions = {
+            str(region_index): result
+            for region_index, result in zip(regions_indexes, results)
+        }
+        failed = sum(1 for region in regions.values() if region["status"] == "error")
+
+        return to_json(
+            {
+                "status": "success" if failed < len(regions) else "error",
+                "project_id": project_id,
+                "regions": regions,
+                "failed_regions": failed,
+                "keywords": keywords,
+            },
+        )
+    except Exception as e:
+        return to_json(
+            {"status": "error", "message": f"Error syncing positions: {str(e)}"},
+        )
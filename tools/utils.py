@@ -0,0 +1,122 @@
+import functools
+import json
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+
+from logic.datasets import datasets, field_names
+from logic.stats import current_stats, track_call
+
+try:
+    import orjson
+except ImportError:  # optional, the standard encoder is used without it
+    orjson = None
+
+load_dotenv()
+
+# pretty - indentation as chosen by each tool, compact - no whitespace at all
+OUTPUT_FORMAT = os.getenv("MCP_OUTPUT_FORMAT", "pretty").lower()
+
+output_logger = logging.getLogger("tools.output")
+
+# Rows shown instead of the full dataset when a tool is called with dataset_only
+DATASET_PREVIEW_ROWS = 5
+
+
+def tool_call(tool):
+    """Collect upstream call stats (retries etc.) while the tool runs"""
+
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs):
+        with track_call(tool.__name__):
+            return await tool(*args, **kwargs)
+
+    return wrapper
+
+
+def dataset_fields(rows, source, data_key, dataset_only=False):
+    """
+    Register fetched rows as a dataset for query_dataset.
+
+    Returns:
+        Response fields: dataset handle and size plus the rows under data_key,
+        or only their field names and a short preview with dataset_only
+    """
+    fields = {"dataset_handle": datasets.put(rows, source), "dataset_rows": len(rows)}
+    if dataset_only:
+        fields["dataset_fields"] = field_names(rows)
+        fields["preview"] = rows[:DATASET_PREVIEW_ROWS]
+    else:
+        fields[data_key] = rows
+    return fields
+
+
+def _encode(data, indent):
+    if OUTPUT_FORMAT == "compact":
+        if orjson is not None:
+            try:
+                return orjson.dumps(data).decode("utf-8")
+            except TypeError:  # e.g. integers out of 64-bit range
+                pass
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(data, indent=indent, ensure_ascii=False)
+
+
+def _append_field(text, name, value, indent):
+    """
+    Add a field to an encoded JSON object without encoding the object again.
+
+    The field is encoded alone in the same output format and put before the
+    closing brace, so the layout matches the rest of the object.
+    """
+    field = _encode({name: value}, indent).strip()[1:-1]
+    head = text.rstrip()[:-1].rstrip()
+    if head.endswith("{"):
+        separator = ""
+    elif field[:1].isspace() or OUTPUT_FORMAT == "compact":
+        separator = ","
+    else:
+        separator = ", "
+    return f"{head}{separator}{field}}}"
+
+
+def to_json(data, indent=None, timing=None):
+    """
+    Serialize tool response and attach stats of the current tool call.
+
+    indent only applies to the pretty output format (MCP_OUTPUT_FORMAT).
+
+    Args:
+        timing: Optional dict of timings measured by the tool (e.g. upstream_ms),
+            added to the response as "timing" together with serialize_ms and
+            bytes of the response body (the response without the timing field)
+    """
+    stats = current_stats()
+    if stats is not None and isinstance(data, dict):
+        data = {**data, "stats": stats.as_dict()}
+
+    started = time.perf_counter()
+    text = _encode(data, indent)
+    encode_ms = (time.perf_counter() - started) * 1000
+    log_output = output_logger.isEnabledFor(logging.INFO)
+    if not log_output and timing is None:
+        return text
+
+    size = len(text.encode("utf-8"))
+    if log_output:
+        output_logger.info(
+            "tool=%s format=%s bytes=%d encode_ms=%.1f",
+            stats.name if stats is not None else None,
+            OUTPUT_FORMAT,
+            size,
+            encode_ms,
+        )
+
+    if timing is not None and isinstance(data, dict):
+        # Serialize time and size are only known once the body is encoded,
+        # the small timing object is appended instead of encoding it again
+        timing = {**timing, "serialize_ms": round(encode_ms, 1), "bytes": size}
+        text = _append_field(text, "timing", timing, indent)
+    return text
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from typing import Optional
+from logic.warehouse import get_warehouse
+
+from tools.utils import to_json, tool_call
+
+
+def _query_ms(started):
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+@tool_call
+async def get_warehouse_coverage(project_id: Optional[int] = None) -> str:
+    """
+    Show which projects and regions are stored in the local positions warehouse.
+
+    Args:
+        project_id: Project ID in Topvisor (default - all projects)
+
+    Returns:
+        JSON string with stored date range, size and last sync of every project region
+    """
+    try:
+        started = time.perf_counter()
+        regions = await asyncio.to_thread(get_warehouse().coverage, project_id)
+
+        return to_json(
+            {
+                "status": "success",
+                "regions": regions,
+                "total_count": len(regions),
+                "query_ms": _query_ms(started),
+            },
+        )
+    except Exception as e:
+        return to_json(
+            {"status": "error", "message": f"Error reading warehouse: {str(e)}"},
+        )
+
+
+@tool_call
+async def get_warehouse_position_stats(
+    project_id: int,
+    region_index: Optional[str] = None,
+    date1: Optional[str] = None,
+    date2: Optional[str] = None,
+    folder_id: Optional[int] = None,
+    group_id: Optional[int] = None,
+    keyword_id: Optional[int] = None,
+    group_by: Optional[str] = None,
+    limit: int = 100,
+) -> str:
+    """
+    Aggregate keyword positions stored in the local warehouse without calling Topvisor.
+
+    Fill the warehouse first with sync_topvisor_positions, it also stores
+    keyword folders and groups. Not ranking positions are excluded from
+    averages and counted as not_ranking.
+
+    Args:
+        project_id: Project ID in Topvisor
+        region_index: Region index (default - all regions)
+        date1: Period start date in YYYY-MM-DD format (default - all stored dates)
+        date2: Period end date in YYYY-MM-DD format (default - all stored dates)
+        folder_id: Only keywords of this folder
+        group_id: Only keywords of this group
+        keyword_id: Only this keyword
+        group_by: None (one total), "date", "region", "keyword", "folder" or "group"
+        limit: Max number of groups (default 100)
+
+    Returns:
+        JSON string with position count, average/best/worst position and top 3/top 10 counts
+    """
+    try:
+        started = time.perf_counter()
+        aggregates = await asyncio.to_thread(
+            get_warehouse().position_stats,
+            project_id,
+            region_index,
+            date1,
+            date2,
+            folder_id,
+            group_id,
+            keyword_id,
+            group_by,
+            limit,
+        )
+
+        return to_json(
+            {
+                "status": "success",
+                "project_id": project_id,
+                "group_by": group_by,
+                "aggregates": aggregates if group_by else aggregates[0],
+                "query_ms": _query_ms(started),
+            },
+        )
+    except Exception as e:
+        return to_json(
+            {"status": "error", "message": f"Error reading warehouse: {str(e)}"},
+        )
+
+
+@tool_call
+async def get_warehouse_position_changes(
+    project_id: int, region_index: str, date1: str, date2: str, limit: int = 20
+) -> str:
+    """
+    Compare stored keyword positions of a region between two dates.
+
+    Args:
+        project_id: Project ID in Topvisor
+        region_index: Region index
+        date1: Earlier date in YYYY-MM-DD format
+        date2: Later date in YYYY-MM-DD format
+        limit: Max keywords in improved and declined lists (default 20)
+
+    Returns:
+        JSON string with counts and the biggest improvements and declines
+    """
+    try:
+        started = time.perf_counter()
+        changes = await asyncio.to_thread(
+            get_warehouse().position_changes,
+            project_id,
+            region_index,
+            date1,
+            date2,
+            limit,
+        )
+
+        return to_json(
+            {
+                "status": "success",
+                "project_id": project_id,
+                "region_index": region_index,
+                "period": f"{date1} - {date2}",
+                **changes,
+                "query_ms": _query_ms(started),
+            },
+        )
+    except Exception as e:
+        return to_json(
+            {"status": "error", "message": f"Error reading warehouse: {str(e)}"},
+        )